@@ -0,0 +1,64 @@
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.environ.get("TODO_CACHE_SIZE", "256"))
+
+
+class VersionedLRUCache:
+    """Thread-safe LRU cache whose entries are tagged with a data version.
+
+    Callers pass the current data version (see ``database.get_data_version``)
+    on every lookup. The version lives in the database, so a write committed
+    by any worker process invalidates entries in all of them without
+    cross-process messaging. A ``maxsize`` of 0 disables caching.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "maxsize": self.maxsize,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -1,15 +1,261 @@
+import os
 import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
 from typing import Generator
 
-DB_NAME = "todo.db"
+import metrics
+import tracing
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+DB_NAME = os.environ.get("TODO_DB", "todo.db")
+
+# Read-only connections serve GET routes; all writes share one connection.
+# In WAL mode readers see the last committed snapshot and never wait for the
+# writer, and the writer never waits for readers.
+POOL_SIZE = int(os.environ.get("TODO_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("TODO_DB_POOL_TIMEOUT", "10"))
+JOURNAL_MODE = os.environ.get("TODO_DB_JOURNAL_MODE", "WAL").upper()
+BUSY_TIMEOUT_MS = int(os.environ.get("TODO_DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Storage profiles, applied to every connection. cache_size is in KiB when
+# negative. With WAL, synchronous=NORMAL cannot corrupt the database but may
+# lose the most recent commits on power loss; OFF may lose them on an OS crash.
+PROFILES = {
+    "durable": {"synchronous": "FULL", "cache_size": -8000, "mmap_size": 0, "temp_store": "DEFAULT"},
+    "balanced": {"synchronous": "NORMAL", "cache_size": -64000, "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY"},
+    "throughput": {"synchronous": "OFF", "cache_size": -256000, "mmap_size": 1024 * 1024 * 1024, "temp_store": "MEMORY"},
+}
+PROFILE = os.environ.get("TODO_DB_PROFILE", "balanced")
+if PROFILE not in PROFILES:
+    raise ValueError(f"Unknown TODO_DB_PROFILE {PROFILE!r}; expected one of {', '.join(PROFILES)}")
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection subclass so the pool can track instances via weakref."""
+
+
+class MeteredCursor(sqlite3.Cursor):
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            metrics.db_rows.inc()
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        metrics.db_rows.inc(amount=len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        metrics.db_rows.inc(amount=len(rows))
+        return rows
+
+
+class MeteredConnection(PooledConnection):
+    """Counts statements and fetched rows for /metrics (TODO_METRICS=1)."""
+
+    def cursor(self, factory=MeteredCursor):
+        return super().cursor(factory)
+
+    # Connection.execute creates its cursor in C, bypassing cursor() above
+    def execute(self, *args):
+        metrics.db_queries.inc()
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        metrics.db_queries.inc()
+        return self.cursor().executemany(*args)
+
+
+CONNECTION_CLASS = MeteredConnection if metrics.ENABLED else PooledConnection
+
+
+def _configure(conn):
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    for pragma, value in PROFILES[PROFILE].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    if tracing.ENABLED:
+        tracing.tracer.install(conn)
     return conn
 
-def init_db():
-    conn = get_db_connection()
+
+def get_db_connection():
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, factory=CONNECTION_CLASS)
+    return _configure(conn)
+
+
+def get_read_connection():
+    """Open a connection that SQLite itself refuses to write through."""
+    uri = f"{Path(DB_NAME).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=CONNECTION_CLASS)
+    return _configure(conn)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Fixed-size pool of long-lived, pre-configured SQLite connections.
+
+    Idle connections are handed out LIFO, so the most recently used connection
+    (warm page cache, schema already parsed) is reused first. A connection
+    returned with an open transaction is rolled back and counted as a leaked
+    transaction; a connection that is garbage collected without being returned
+    frees its slot and is counted as a leaked connection.
+    """
+
+    def __init__(self, factory=get_db_connection, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self._factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = []
+        self._finalizers = {}
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._leaked_transactions = 0
+        self._leaked_connections = 0
+
+    def _open(self):
+        conn = self._factory()
+        # Parse the schema now rather than on the first real query.
+        conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        if tracing.ENABLED:
+            tracing.tracer.finish(conn)
+        self._finalizers[id(conn)] = weakref.finalize(conn, self._reclaim, id(conn))
+        return conn
+
+    def _reclaim(self, conn_id):
+        with self._cond:
+            self._finalizers.pop(conn_id, None)
+            self._created -= 1
+            self._in_use -= 1
+            self._leaked_connections += 1
+            self._cond.notify()
+
+    def acquire(self):
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            while not self._idle and self._created >= self.size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                self._created += 1
+            self._in_use += 1
+            self._checkouts += 1
+            if waited:
+                elapsed = time.perf_counter() - start
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn):
+        if tracing.ENABLED:
+            tracing.tracer.finish(conn)
+        if conn.in_transaction:
+            conn.rollback()
+            with self._cond:
+                self._leaked_transactions += 1
+        with self._cond:
+            self._idle.append(conn)
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Generator[sqlite3.Connection, None, None]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def warm(self, count=None):
+        """Open up to ``count`` connections ahead of the first request."""
+        conns = [self.acquire() for _ in range(min(count or self.size, self.size))]
+        for conn in conns:
+            self.release(conn)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            self._finalizers.pop(id(conn)).detach()
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time, 6),
+                "wait_time_max": round(self._max_wait, 6),
+                "timeouts": self._timeouts,
+                "leaked_transactions": self._leaked_transactions,
+                "leaked_connections": self._leaked_connections,
+            }
+
+
+read_pool = ConnectionPool(get_read_connection, size=POOL_SIZE)
+write_pool = ConnectionPool(get_db_connection, size=1)
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Generator[sqlite3.Connection, None, None]:
+    """Run a block in one write transaction, taking the write lock up front."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        start = time.perf_counter()
+        conn.commit()
+        metrics.db_commit_duration.observe(time.perf_counter() - start)
+    finally:
+        if tracing.ENABLED:
+            tracing.tracer.finish(conn)
+
+
+# Schema migrations, applied in order. The number of steps applied is stored
+# in PRAGMA user_version, so a database that is already current costs a single
+# pragma read at startup. Append new steps; never edit or reorder old ones.
+
+def _create_todos(conn):
     conn.execute("""
     CREATE TABLE IF NOT EXISTS todos (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -19,20 +265,313 @@ def init_db():
         last_started_at REAL
     )
     """)
-    
-    # Simple migration for existing tables (idempotent)
-    try:
+    # Databases created before the timer feature lack these columns
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(todos)")}
+    if "time_spent" not in columns:
         conn.execute("ALTER TABLE todos ADD COLUMN time_spent INTEGER NOT NULL DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
-        
-    try:
+    if "last_started_at" not in columns:
         conn.execute("ALTER TABLE todos ADD COLUMN last_started_at REAL")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
 
-    conn.commit()
-    conn.close()
 
-# Initialize API on module import (simple for MVP)
-init_db()
+def _add_list_indexes(conn):
+    # Indexes backing the keyset-paginated list filters
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_todos_completed ON todos (completed, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_todos_running ON todos (id) WHERE last_started_at IS NOT NULL")
+
+
+def _add_data_version(conn):
+    # PRAGMA data_version only moves for commits made by *other* connections,
+    # so it cannot be shared across a pool. Triggers keep a persistent counter
+    # instead, bumped by every write to todos from any worker.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sync_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        data_version INTEGER NOT NULL
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO sync_state (id, data_version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS todos_bump_version_{event.lower()} AFTER {event} ON todos
+        BEGIN
+            UPDATE sync_state SET data_version = data_version + 1 WHERE id = 1;
+        END
+        """)
+
+
+def _add_timer_sessions(conn):
+    # Every stop appends a session row and folds it into a per-day (UTC)
+    # rollup, both inside the stopping statement's transaction. A session
+    # is credited to its start day up to midnight; any remainder is credited
+    # to its stop day. (Superseded by _split_sessions_by_day.)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS timer_sessions (
+        id INTEGER PRIMARY KEY,
+        todo_id INTEGER NOT NULL,
+        started_at REAL NOT NULL,
+        stopped_at REAL NOT NULL,
+        duration INTEGER NOT NULL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_timer_sessions_todo ON timer_sessions (todo_id, started_at)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS timer_daily (
+        day TEXT PRIMARY KEY,
+        seconds INTEGER NOT NULL,
+        sessions INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_log_timer_session
+    AFTER UPDATE OF last_started_at ON todos
+    WHEN OLD.last_started_at IS NOT NULL AND NEW.last_started_at IS NULL
+    BEGIN
+        INSERT INTO timer_sessions (todo_id, started_at, stopped_at, duration)
+        VALUES (
+            NEW.id,
+            OLD.last_started_at,
+            OLD.last_started_at + (NEW.time_spent - OLD.time_spent),
+            NEW.time_spent - OLD.time_spent
+        );
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS timer_sessions_rollup
+    AFTER INSERT ON timer_sessions
+    BEGIN
+        INSERT INTO timer_daily (day, seconds, sessions)
+        SELECT date(NEW.started_at, 'unixepoch'), MIN(NEW.duration, until_midnight), 1
+        FROM (
+            SELECT CAST(strftime('%s', date(NEW.started_at, 'unixepoch', '+1 day')) AS INTEGER)
+                - CAST(NEW.started_at AS INTEGER) AS until_midnight
+        )
+        WHERE true
+        ON CONFLICT (day) DO UPDATE SET
+            seconds = seconds + excluded.seconds,
+            sessions = sessions + 1;
+
+        INSERT INTO timer_daily (day, seconds, sessions)
+        SELECT date(NEW.stopped_at, 'unixepoch'), NEW.duration - until_midnight, 0
+        FROM (
+            SELECT CAST(strftime('%s', date(NEW.started_at, 'unixepoch', '+1 day')) AS INTEGER)
+                - CAST(NEW.started_at AS INTEGER) AS until_midnight
+        )
+        WHERE NEW.duration > until_midnight
+        ON CONFLICT (day) DO UPDATE SET seconds = seconds + excluded.seconds;
+    END
+    """)
+
+
+def _add_todo_stats(conn):
+    # Single summary row kept exact by triggers, so statistics never need a
+    # scan of todos. stats.py can recompute and compare it.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS todo_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL,
+        completed INTEGER NOT NULL,
+        running INTEGER NOT NULL,
+        time_spent INTEGER NOT NULL
+    )
+    """)
+    conn.execute("""
+    INSERT OR REPLACE INTO todo_stats (id, total, completed, running, time_spent)
+    SELECT 1, count(*), coalesce(sum(completed != 0), 0),
+           coalesce(sum(last_started_at IS NOT NULL), 0), coalesce(sum(time_spent), 0)
+    FROM todos
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_stats_insert AFTER INSERT ON todos
+    BEGIN
+        UPDATE todo_stats SET
+            total = total + 1,
+            completed = completed + (NEW.completed != 0),
+            running = running + (NEW.last_started_at IS NOT NULL),
+            time_spent = time_spent + NEW.time_spent
+        WHERE id = 1;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_stats_delete AFTER DELETE ON todos
+    BEGIN
+        UPDATE todo_stats SET
+            total = total - 1,
+            completed = completed - (OLD.completed != 0),
+            running = running - (OLD.last_started_at IS NOT NULL),
+            time_spent = time_spent - OLD.time_spent
+        WHERE id = 1;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_stats_update
+    AFTER UPDATE OF completed, time_spent, last_started_at ON todos
+    BEGIN
+        UPDATE todo_stats SET
+            completed = completed + (NEW.completed != 0) - (OLD.completed != 0),
+            running = running + (NEW.last_started_at IS NOT NULL) - (OLD.last_started_at IS NOT NULL),
+            time_spent = time_spent + NEW.time_spent - OLD.time_spent
+        WHERE id = 1;
+    END
+    """)
+
+
+def _add_title_search(conn):
+    # External-content FTS5 index over titles: the text lives only in todos,
+    # the index stores tokens. Prefix indexes make short "abc*" queries cheap.
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title,
+        content = 'todos',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos
+    BEGIN
+        INSERT INTO todos_fts (rowid, title) VALUES (NEW.id, NEW.title);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos
+    BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+    END
+    """)
+    # Timer and completion updates leave the index alone
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title ON todos
+    WHEN NEW.title IS NOT OLD.title
+    BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+        INSERT INTO todos_fts (rowid, title) VALUES (NEW.id, NEW.title);
+    END
+    """)
+    # Backfill existing rows from the content table
+    conn.execute("INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')")
+
+
+def _add_change_log(conn):
+    # Delta sync: one row per todo recording its latest change, so the log
+    # holds at most one entry per todo and "what changed since seq N" is a
+    # range scan over seq. REPLACE drops the todo's previous entry and the
+    # new entry gets a fresh seq (AUTOINCREMENT never reuses one). A delete
+    # leaves a tombstone until compaction expires it.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        todo_id INTEGER NOT NULL UNIQUE,
+        deleted BOOLEAN NOT NULL DEFAULT 0,
+        changed_at REAL NOT NULL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_tombstones ON changes (changed_at) WHERE deleted")
+    # Highest seq of an expired tombstone: cursors below it may have missed
+    # a delete and must resync
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(sync_state)")}
+    if "change_horizon" not in columns:
+        conn.execute("ALTER TABLE sync_state ADD COLUMN change_horizon INTEGER NOT NULL DEFAULT 0")
+    now = "((julianday('now') - 2440587.5) * 86400.0)"
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS todos_log_change_insert AFTER INSERT ON todos
+    BEGIN
+        REPLACE INTO changes (todo_id, deleted, changed_at) VALUES (NEW.id, 0, {now});
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS todos_log_change_update AFTER UPDATE ON todos
+    BEGIN
+        REPLACE INTO changes (todo_id, deleted, changed_at) VALUES (NEW.id, 0, {now});
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS todos_log_change_delete AFTER DELETE ON todos
+    BEGIN
+        REPLACE INTO changes (todo_id, deleted, changed_at) VALUES (OLD.id, 1, {now});
+    END
+    """)
+
+
+def _add_started_at_index(conn):
+    # Running timers in start order: GET /todos/running and finding timers
+    # started before a cutoff read only the few running rows
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_todos_started_at ON todos (last_started_at) WHERE last_started_at IS NOT NULL"
+    )
+
+
+def _add_running_completed_index(conn):
+    # completed=X&running=true: idx_todos_completed would visit every todo
+    # with that flag to find the few running ones
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_todos_running_completed ON todos (completed, id) "
+        "WHERE last_started_at IS NOT NULL"
+    )
+
+
+def _split_sessions_by_day(conn):
+    # The rollup trigger credited a session crossing several midnights to
+    # its start and stop days only. The rollup now runs in the stopping
+    # transactions (repository.roll_up_sessions), which can split a session
+    # at every midnight; rebuild the rollup from the session log. The SQL is
+    # a copy, so later changes to the repository cannot alter this step.
+    conn.execute("DROP TRIGGER IF EXISTS timer_sessions_rollup")
+    conn.execute("DELETE FROM timer_daily")
+    conn.execute("""
+    WITH RECURSIVE pieces (t, remaining, first) AS (
+        SELECT CAST(started_at AS INTEGER), duration, 1 FROM timer_sessions
+        UNION ALL
+        SELECT (t / 86400 + 1) * 86400, remaining - ((t / 86400 + 1) * 86400 - t), 0
+        FROM pieces WHERE remaining > (t / 86400 + 1) * 86400 - t
+    )
+    INSERT INTO timer_daily (day, seconds, sessions)
+    SELECT date(t, 'unixepoch'), sum(min(remaining, (t / 86400 + 1) * 86400 - t)), sum(first)
+    FROM pieces GROUP BY 1
+    """)
+
+
+MIGRATIONS = [
+    _create_todos,
+    _add_list_indexes,
+    _add_data_version,
+    _add_timer_sessions,
+    _add_todo_stats,
+    _add_title_search,
+    _add_change_log,
+    _add_started_at_index,
+    _add_running_completed_index,
+    _split_sessions_by_day,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Bring the schema up to SCHEMA_VERSION and return the version found."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return version
+
+    with transaction(conn):
+        # Re-read under the write lock: another worker may have migrated first
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+    return version
+
+
+def get_data_version(conn: sqlite3.Connection) -> int:
+    """Return the counter bumped by every committed change to todos."""
+    return conn.execute("SELECT data_version FROM sync_state WHERE id = 1").fetchone()[0]
+
+
+def init_db():
+    conn = get_db_connection()
+    try:
+        # journal_mode is persistent and cannot change inside a transaction
+        if conn.execute("PRAGMA journal_mode").fetchone()[0].upper() != JOURNAL_MODE:
+            conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
+        migrate(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,121 @@
+import asyncio
+import itertools
+import json
+import os
+
+QUEUE_SIZE = int(os.environ.get("TODO_EVENTS_QUEUE_SIZE", "256"))
+MAX_SUBSCRIBERS = int(os.environ.get("TODO_EVENTS_MAX_SUBSCRIBERS", "10000"))
+HEARTBEAT_SECONDS = 15.0
+
+
+class TooManySubscribers(Exception):
+    """Raised when a worker already holds MAX_SUBSCRIBERS event streams."""
+
+
+class Subscriber:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(queue_size)
+        self.dropped = False
+
+
+class EventBroker:
+    """Fan-out of todo change events to Server-Sent Events subscribers.
+
+    Each event is encoded into an SSE frame once and the same string is
+    queued for every subscriber, so an idle subscriber costs one small
+    bounded queue and a suspended coroutine. A subscriber whose queue fills
+    up (a slow consumer) is sent a ``resync`` event and disconnected rather
+    than allowed to buffer without limit; the client reconnects and
+    refetches.
+
+    Events only reach subscribers of the worker process that handled the
+    write. ``publish`` may be called from threadpool threads.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, max_subscribers=MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._loop = None
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def attach(self, loop):
+        self._loop = loop
+
+    def detach(self):
+        self._loop = None
+        for subscriber in list(self._subscribers):
+            self._close(subscriber, None)
+
+    def subscribe(self):
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribers("Too many event subscribers")
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        frame = f"id: {next(self._ids)}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(frame)
+        else:
+            loop.call_soon_threadsafe(self._fanout, frame)
+
+    def _fanout(self, frame):
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self._close(subscriber, "event: resync\ndata: {}\n\n")
+
+    def _close(self, subscriber, final_frame):
+        self._subscribers.discard(subscriber)
+        subscriber.dropped = True
+        queue = subscriber.queue
+        while not queue.empty():
+            queue.get_nowait()
+        if final_frame:
+            queue.put_nowait(final_frame)
+        queue.put_nowait(None)
+
+    async def stream(self, subscriber):
+        """Yield SSE frames for ``subscriber`` until it is closed."""
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+        }
+
+
+broker = EventBroker()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import POOL_SIZE, read_pool
+from writer import run_write, writer
+
+# One read thread per read-only connection, so a thread never waits on the
+# pool. Writes get their own single thread for the single writer connection,
+# so queued writes can never occupy the threads readers need.
+DB_WORKERS = int(os.environ.get("TODO_DB_WORKERS", str(POOL_SIZE)))
+# Requests allowed to queue for a DB thread before new ones are refused.
+MAX_PENDING = int(os.environ.get("TODO_DB_MAX_PENDING", "256"))
+
+
+class ExecutorOverloaded(Exception):
+    """Raised when MAX_PENDING database calls are already queued or running."""
+
+
+class DBExecutor:
+    """Dedicated, bounded thread pool for blocking SQLite calls.
+
+    Async endpoints ``await`` database work here instead of occupying
+    Starlette's shared threadpool, so the DB concurrency limit is explicit
+    (``workers``) and slow queries can only delay other database calls,
+    never unrelated routes. Time spent waiting for a free DB thread is
+    recorded separately from execution time.
+    """
+
+    def __init__(self, workers=DB_WORKERS, max_pending=MAX_PENDING, name="db"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.run_time = 0.0
+
+    async def run(self, fn, *args):
+        # _pending is only touched from the event loop thread
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorOverloaded("Too many pending database calls")
+        self._pending += 1
+        queued_at = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self.calls += 1
+                    self.wait_time += started - queued_at
+                    self.max_wait = max(self.max_wait, started - queued_at)
+                    self.run_time += finished - started
+
+        try:
+            return await asyncio.wrap_future(self._executor.submit(call))
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "calls": self.calls,
+                "rejected": self.rejected,
+                "wait_time_total": round(self.wait_time, 6),
+                "wait_time_max": round(self.max_wait, 6),
+                "run_time_total": round(self.run_time, 6),
+            }
+
+
+read_executor = DBExecutor(name="db-read")
+write_executor = DBExecutor(workers=1, name="db-write")
+
+
+def _with_connection(fn, args):
+    with read_pool.connection() as conn:
+        return fn(conn, *args)
+
+
+async def db_read(fn, *args):
+    """Run ``fn(conn, *args)`` on a read-only pooled connection."""
+    return await read_executor.run(_with_connection, fn, args)
+
+
+async def db_write(fn, *args):
+    """Run ``fn(conn, *args)`` in a write transaction (see ``run_write``)."""
+    if writer.running:
+        # The group-commit writer has its own thread; just await its future.
+        # There is no deadline: once queued, the write may commit at any
+        # time, so giving up on it could report a failure for a saved change.
+        return await asyncio.wrap_future(writer.submit(fn, *args))
+    return await write_executor.run(run_write, fn, *args)
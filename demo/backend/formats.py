@@ -0,0 +1,217 @@
+"""
+Wire formats for bulk reads and writes, and Accept-header negotiation.
+
+JSON is always available. NDJSON (one todo per line) is streamed, so a
+client can read any number of todos with constant server memory.
+MessagePack is a compact binary body encoded by ``msgpack`` (in
+requirements.txt); an install without it answers clients that accept only
+MessagePack with 406 instead of failing at import.
+CSV is offered for export and import only.
+"""
+
+import csv
+import json
+
+from pydantic import ValidationError
+
+from models import TodoCreate
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/msgpack"
+CSV = "text/csv"
+
+# Other names clients use for the same formats
+ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+
+def available():
+    """Media types this process can produce, in order of server preference."""
+    return [JSON, NDJSON] + ([MSGPACK] if msgpack is not None else [])
+
+
+def _parse_accept(accept):
+    """Yield ``(media_range, q)`` for each entry of an Accept header."""
+    for part in accept.split(","):
+        media_range, *params = [piece.strip() for piece in part.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        yield ALIASES.get(media_range.lower(), media_range.lower()), q
+
+
+def negotiate(accept, offered=None):
+    """Return the offered media type the Accept header prefers, or None.
+
+    Each offer takes the q-value of the most specific range matching it
+    (``type/subtype`` over ``type/*`` over ``*/*``). A missing header
+    accepts anything, and ties go to the earlier offer, so ``*/*`` gets JSON.
+    """
+    offered = offered or available()
+    if not accept:
+        return offered[0]
+    ranges = list(_parse_accept(accept))
+    best, best_q = None, 0.0
+    for media_type in offered:
+        matches = [
+            (specificity, q)
+            for media_range, q in ranges
+            for specificity, pattern in ((2, media_type), (1, media_type.split("/")[0] + "/*"), (0, "*/*"))
+            if media_range == pattern
+        ]
+        if matches:
+            q = max(matches)[1]
+            if q > best_q:
+                best, best_q = media_type, q
+    return best
+
+
+def pack(todos):
+    """Encode todo dicts as a MessagePack array of maps."""
+    return msgpack.packb(todos, use_bin_type=True)
+
+
+# Longest record accepted on import; a longer one (or a missing line break)
+# aborts the import instead of buffering without bound
+MAX_RECORD_BYTES = 1024 * 1024
+
+
+class MalformedUpload(Exception):
+    """The upload cannot be read any further; ``line`` is where it failed."""
+
+    def __init__(self, line, reason):
+        super().__init__(f"line {line}: {reason}")
+        self.line = line
+        self.reason = reason
+
+
+async def read_lines(chunks):
+    """Yield ``(line_number, bytes)`` for each line of a byte stream, without the line break."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, line.removesuffix(b"\r")
+        if len(buffer) > MAX_RECORD_BYTES:
+            raise MalformedUpload(number + 1, f"line longer than {MAX_RECORD_BYTES} bytes")
+    if buffer:
+        yield number + 1, buffer.removesuffix(b"\r")
+
+
+def _decode(line, first):
+    return line.decode("utf-8-sig" if first else "utf-8")
+
+
+async def read_todos(chunks, media_type):
+    """Parse an NDJSON or CSV upload into todos to create.
+
+    Yields ``(line_number, todo)`` where ``todo`` is a ``TodoCreate``, or an
+    error message for a record that cannot be imported. Blank lines are
+    skipped. CSV needs a header row with a ``title`` column; other columns
+    named like ``TodoCreate`` fields are used, the rest (such as ``id`` in
+    an export) are ignored, and empty values take the field's default.
+    """
+    if media_type == NDJSON:
+        async for number, line in read_lines(chunks):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(_decode(line, number == 1))
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+                yield number, TodoCreate.model_validate(record)
+            except (ValueError, ValidationError) as exc:
+                yield number, _error(exc)
+        return
+
+    header = None
+    record, start, quoted = "", 0, False
+    async for number, line in read_lines(chunks):
+        try:
+            text = _decode(line, number == 1)
+        except UnicodeDecodeError as exc:
+            if header is None:
+                raise MalformedUpload(number, str(exc))
+            yield number, str(exc)
+            continue
+        if not record:
+            if not text.strip():
+                continue
+            start = number
+        record += text
+        # A quoted field may span lines: the record goes on while one is open
+        quoted = _still_quoted(text, quoted)
+        if quoted:
+            record += "\n"
+            if len(record) > MAX_RECORD_BYTES:
+                raise MalformedUpload(start, f"record longer than {MAX_RECORD_BYTES} bytes")
+            continue
+        try:
+            values = next(csv.reader([record]))
+        except csv.Error as exc:
+            values = exc
+        record = ""
+        if header is None:
+            if isinstance(values, Exception) or "title" not in values:
+                raise MalformedUpload(start, "the first CSV record must be a header with a title column")
+            header = values
+            continue
+        if isinstance(values, Exception):
+            yield start, str(values)
+        elif len(values) != len(header):
+            yield start, f"expected {len(header)} fields, got {len(values)}"
+        else:
+            fields = {name: value for name, value in zip(header, values) if value != ""}
+            try:
+                yield start, TodoCreate.model_validate(fields)
+            except ValidationError as exc:
+                yield start, _error(exc)
+    if record:
+        yield start, "unterminated quoted field"
+    elif header is None:
+        raise MalformedUpload(1, "the first CSV record must be a header with a title column")
+
+
+def _still_quoted(line, quoted):
+    """Return whether a quoted CSV field is open after ``line``.
+
+    ``quoted`` tells whether one was open before it. As in the ``csv``
+    module, a quote opens a field only as the field's first character;
+    elsewhere in an unquoted field (``Buy 5" nails``) it is literal.
+    """
+    if '"' not in line:
+        return quoted
+    at_field_start = not quoted
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if quoted:
+            if char == '"':
+                if line[i + 1:i + 2] == '"':
+                    i += 1
+                else:
+                    quoted = False
+        elif char == '"' and at_field_start:
+            quoted = True
+        at_field_start = not quoted and char == ","
+        i += 1
+    return quoted
+
+
+def _error(exc):
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'record'}: {e['msg']}" for e in exc.errors())
+    return str(exc)
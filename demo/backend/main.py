@@ -1,10 +1,59 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from database import get_db_connection, init_db
-from models import TodoCreate, TodoUpdate, TodoResponse
-import sqlite3
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from cache import VersionedLRUCache
+from database import PoolTimeout, get_data_version, init_db, read_pool, write_pool
+from events import TooManySubscribers, broker
+from executor import ExecutorOverloaded, db_read, db_write, read_executor, write_executor
+from maintenance import start_jobs, stop_jobs
+from repository import ChangeLogExpired, TodoNotFound
+from stats import read_stats
+from tracing import tracer
+from transfer import ImportAborted
+from writer import GROUP_COMMIT, WriterOverloaded, writer
+import formats
+import metrics
+from models import (
+    BatchItemResult,
+    ImportSummary,
+    TimeReport,
+    TodoChanges,
+    TodoStats,
+    TodoBatchCreate,
+    TodoBatchDelete,
+    TodoBatchUpdate,
+    TodoCreate,
+    TodoResponse,
+    TodoUpdate,
+)
+import repository
+import transfer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Migrate the schema (a no-op pragma read when current), then open the
+    # pooled connections before the first request arrives
+    init_db()
+    read_pool.warm()
+    write_pool.warm()
+    if GROUP_COMMIT:
+        writer.start()
+    broker.attach(asyncio.get_running_loop())
+    jobs = start_jobs()
+    yield
+    await stop_jobs(jobs)
+    broker.detach()
+    writer.stop()
+    read_executor.shutdown()
+    write_executor.shutdown()
+    read_pool.close()
+    write_pool.close()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend
 # Enable CORS for frontend (allow all for dev)
@@ -16,102 +65,389 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Next-Offset"],
 )
 
-# Initialize DB on startup
-init_db()
+# Outermost, so recorded latency includes CORS and error handling
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware, routes=app.router.routes)
+
+@app.exception_handler(PoolTimeout)
+def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.exception_handler(WriterOverloaded)
+def writer_overloaded_handler(request: Request, exc: WriterOverloaded):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.exception_handler(ExecutorOverloaded)
+def executor_overloaded_handler(request: Request, exc: ExecutorOverloaded):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.exception_handler(TodoNotFound)
+def todo_not_found_handler(request: Request, exc: TodoNotFound):
+    return JSONResponse(status_code=404, content={"detail": "Todo not found"})
+
+@app.exception_handler(ChangeLogExpired)
+def change_log_expired_handler(request: Request, exc: ChangeLogExpired):
+    return JSONResponse(status_code=410, content={"detail": "Sync cursor expired; reload all todos"})
+
+@app.exception_handler(ImportAborted)
+def import_aborted_handler(request: Request, exc: ImportAborted):
+    return JSONResponse(
+        status_code=422,
+        content={"detail": exc.reason, "line": exc.line, **exc.summary},
+    )
+
+@app.exception_handler(TooManySubscribers)
+def too_many_subscribers_handler(request: Request, exc: TooManySubscribers):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Hello World"}
 
-@app.get("/todos", response_model=list[TodoResponse])
-def get_todos():
-    conn = get_db_connection()
-    todos = conn.execute("SELECT * FROM todos").fetchall()
-    conn.close()
-    
-    results = []
-    for todo in todos:
-        t = dict(todo)
-        t["is_running"] = t["last_started_at"] is not None
-        results.append(t)
-        
-    return results
+@app.get("/debug/pool")
+async def pool_stats():
+    return {"read": read_pool.stats(), "write": write_pool.stats()}
+
+@app.get("/debug/cache")
+async def cache_stats():
+    return list_cache.stats()
+
+@app.get("/debug/events")
+async def event_stats():
+    return broker.stats()
+
+@app.get("/debug/writer")
+async def writer_stats():
+    return writer.stats()
+
+@app.get("/debug/executor")
+async def executor_stats():
+    return {"read": read_executor.stats(), "write": write_executor.stats()}
+
+@app.get("/debug/queries")
+async def query_stats(top: int = Query(50, ge=1, le=1000)):
+    # Per-fingerprint statement stats; populated only with TODO_SQL_TRACE=1
+    return tracer.stats(top)
+
+@metrics.registry.collector
+def component_metrics():
+    pools = {"read": read_pool.stats(), "write": write_pool.stats()}
+    executors = {"read": read_executor.stats(), "write": write_executor.stats()}
+    writer_stats = writer.stats()
+    return [
+        ("todo_db_pool_waits_total", "counter", "Connection checkouts that had to wait.",
+         [({"pool": name}, s["waits"]) for name, s in pools.items()]),
+        ("todo_db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection.",
+         [({"pool": name}, s["wait_time_total"]) for name, s in pools.items()]),
+        ("todo_db_pool_timeouts_total", "counter", "Checkouts that gave up waiting.",
+         [({"pool": name}, s["timeouts"]) for name, s in pools.items()]),
+        ("todo_db_pool_connections_in_use", "gauge", "Pooled connections currently checked out.",
+         [({"pool": name}, s["in_use"]) for name, s in pools.items()]),
+        ("todo_db_executor_pending", "gauge", "Database calls queued or running.",
+         [({"executor": name}, s["pending"]) for name, s in executors.items()]),
+        ("todo_db_executor_rejected_total", "counter", "Database calls refused because the executor was full.",
+         [({"executor": name}, s["rejected"]) for name, s in executors.items()]),
+        ("todo_writer_batches_total", "counter", "Group-commit batches committed.",
+         [({}, writer_stats["batches"])]),
+        ("todo_writer_queued", "gauge", "Mutations waiting for the group-commit writer.",
+         [({}, writer_stats["queued"])]),
+    ]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Hot list pages keyed by their query parameters, validated against the data
+# version on every hit
+list_cache = VersionedLRUCache()
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+@app.get("/todos/events")
+async def todo_events():
+    """Server-Sent Events stream of todo changes.
+
+    Events: ``created``, ``updated`` and ``timer`` carry ``{"todos": [...]}``,
+    ``deleted`` carries ``{"ids": [...]}``.
+    ``resync`` means events were lost and the client should refetch.
+    """
+    subscriber = broker.subscribe()
+    return StreamingResponse(
+        broker.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/todos/running", response_model=list[TodoResponse])
+async def running_todos(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    """Running timers, longest running first, read from the started-at index."""
+    return await db_read(repository.running_todos, limit)
+
+@app.get("/todos/stats", response_model=TodoStats)
+async def todo_stats():
+    # Maintained incrementally by triggers; see stats.py for the consistency check
+    stats = await db_read(read_stats)
+    stats["average_time_spent"] = stats["time_spent"] / stats["total"] if stats["total"] else 0.0
+    return stats
+
+@app.get("/todos/changes", response_model=TodoChanges)
+async def todo_changes(
+    since: int | None = Query(None, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Delta sync: todos changed and ids deleted after cursor ``since``.
+
+    Without ``since`` only the current cursor is returned; take it before the
+    initial full load. Keep requesting with the returned ``cursor`` while
+    ``has_more`` is true. 410 means the cursor expired: reload everything.
+    """
+    return await db_read(repository.read_changes, since, limit)
+
+SEARCH_PAGE_SIZE = 20
+
+@app.get("/todos/search", response_model=list[TodoResponse])
+async def search_todos(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=100),
+    offset: int = Query(0, ge=0, lt=repository.MAX_SEARCH_MATCHES),
+):
+    """Full-text search over titles, best match first (see ``search_todos``)."""
+    expression = repository.search_expression(q)
+    if expression is None:
+        raise HTTPException(status_code=422, detail="q must contain at least one word")
+    todos, next_offset = await db_read(repository.search_todos, expression, limit, offset)
+    if next_offset is not None:
+        response.headers["X-Next-Offset"] = str(next_offset)
+    return todos
+
+RESPONSE_FIELDS = tuple(TodoResponse.model_fields)
+
+def load_todo_page(conn, if_none_match, media_type, query):
+    """Return ``(etag, page)``; ``page`` is None when the client's copy is current.
+
+    A page with a running timer gets no ETag: its ``effective_time_spent``
+    changes with the clock, not with a write, so no tag could stay valid.
+    """
+    # The data version changes on every committed write, so it identifies the
+    # current representation of any page without a running timer; while no
+    # timer runs, an unchanged list costs two index lookups.
+    version = get_data_version(conn)
+    etag = page_etag(version, media_type)
+    timers_running = repository.any_running(conn)
+    if not timers_running and etag_matches(if_none_match, etag):
+        return etag, None
+    key = (media_type, *query)
+    page = list_cache.get(key, version)
+    if page is None:
+        if media_type == formats.MSGPACK:
+            todos, next_cursor = repository.query_todos(conn, *query)
+            body = formats.pack([{field: todo[field] for field in RESPONSE_FIELDS} for todo in todos])
+            running = any(todo["is_running"] for todo in todos)
+        else:
+            body, next_cursor, running = repository.query_todos_json(conn, *query)
+        page = body, next_cursor
+        if running:
+            # Neither cached nor revalidated: it goes stale as time passes
+            return None, page
+        list_cache.put(key, version, page)
+    # Timers run elsewhere in the table, but not on this page
+    if timers_running and etag_matches(if_none_match, etag):
+        return etag, None
+    return etag, page
+
+def page_etag(version, media_type):
+    # Each representation of a page needs its own entity tag
+    return f'"{version}"' if media_type == formats.JSON else f'"{version}-msgpack"'
+
+@app.get(
+    "/todos",
+    response_model=list[TodoResponse],
+    responses={200: {"content": {
+        formats.NDJSON: {"schema": {"type": "string", "description": "One TodoResponse per line"}},
+        formats.MSGPACK: {"schema": {"type": "string", "format": "binary"}},
+    }}, 406: {"description": "None of the accepted media types is available"}},
+)
+async def get_todos(
+    request: Request,
+    after_id: int | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    completed: bool | None = None,
+    running: bool | None = None,
+    order: Literal["asc", "desc"] = "asc",
+):
+    """List todos in id order, paged by ``after_id`` (see ``X-Next-Cursor``).
+
+    ``Accept`` selects the body: JSON (the default) or MessagePack, or
+    ``application/x-ndjson`` to stream one todo per line. An NDJSON response
+    is not paged: without ``limit`` it streams every todo after ``after_id``.
+
+    Pages without a running timer carry an ETag and answer a matching
+    ``If-None-Match`` with 304. A page with a running timer has no ETag,
+    since its ``effective_time_spent`` changes every second.
+    """
+    media_type = formats.negotiate(request.headers.get("accept"))
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Available types: {', '.join(formats.available())}")
+    if media_type == formats.NDJSON:
+        return StreamingResponse(
+            transfer.stream_todos(after_id, limit, completed, running, order),
+            media_type=formats.NDJSON,
+            headers={"Cache-Control": "no-store", "Vary": "Accept"},
+        )
+
+    query = (after_id, limit or DEFAULT_PAGE_SIZE, completed, running, order)
+    etag, page = await db_read(load_todo_page, request.headers.get("if-none-match"), media_type, query)
+    cache_headers = {"Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag is not None:
+        cache_headers["ETag"] = etag
+    if page is None:
+        return Response(status_code=304, headers=cache_headers)
+
+    # The page is already encoded (by SQLite for JSON) and cached as bytes,
+    # so it is sent as is; response_model only documents the schema
+    body, next_cursor = page
+    if next_cursor is not None:
+        cache_headers["X-Next-Cursor"] = str(next_cursor)
+    return Response(body, media_type=media_type, headers=cache_headers)
+
+EXPORT_TYPES = [formats.NDJSON, formats.CSV]
+
+@app.get(
+    "/todos/export",
+    responses={200: {"content": {
+        formats.NDJSON: {"schema": {"type": "string", "description": "One TodoResponse per line"}},
+        formats.CSV: {"schema": {"type": "string", "description": repository.CSV_HEADER}},
+    }}, 406: {"description": "Neither NDJSON nor CSV is accepted"}},
+)
+async def export_todos(request: Request, completed: bool | None = None, running: bool | None = None):
+    """Stream every todo in id order as NDJSON (the default) or CSV, chosen by ``Accept``."""
+    media_type = formats.negotiate(request.headers.get("accept"), EXPORT_TYPES)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Available types: {', '.join(EXPORT_TYPES)}")
+    extension = "csv" if media_type == formats.CSV else "ndjson"
+    return StreamingResponse(
+        transfer.export_todos(media_type, completed, running),
+        media_type=media_type,
+        headers={
+            "Cache-Control": "no-store",
+            "Content-Disposition": f'attachment; filename="todos.{extension}"',
+            "Vary": "Accept",
+        },
+    )
+
+@app.post(
+    "/todos/import",
+    response_model=ImportSummary,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        formats.NDJSON: {"schema": {"type": "string", "description": "One TodoCreate per line"}},
+        formats.CSV: {"schema": {"type": "string", "description": "Header row with a title column"}},
+    }}},
+    responses={415: {"description": "Content-Type is neither NDJSON nor CSV"},
+               422: {"description": "The upload became unreadable; earlier chunks stay imported"}},
+)
+async def import_todos(request: Request):
+    """Create todos from an NDJSON or CSV request body, committed in chunks.
+
+    Invalid records are skipped and listed (up to ``MAX_IMPORT_ERRORS``).
+    Progress is published as ``imported`` events; the new todos are not
+    sent as ``created`` events.
+    """
+    media_type = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    if media_type not in EXPORT_TYPES:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be one of: {', '.join(EXPORT_TYPES)}")
+    return await transfer.import_todos(request.stream(), media_type)
 
 @app.post("/todos", response_model=TodoResponse)
-def create_todo(todo: TodoCreate):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO todos (title, completed) VALUES (?, ?)", (todo.title, todo.completed))
-    todo_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return {**todo.dict(), "id": todo_id}
+async def create_todo(todo: TodoCreate):
+    created = await db_write(repository.create_todo, todo.title, todo.completed)
+    broker.publish("created", {"todos": [created]})
+    return created
+
+# Batch endpoints apply every item in one transaction with a single commit.
+
+@app.post("/todos:batchCreate", response_model=list[TodoResponse])
+async def batch_create_todos(batch: TodoBatchCreate):
+    if not batch.items:
+        return []
+    created = await db_write(repository.create_todos, [(item.title, item.completed) for item in batch.items])
+    broker.publish("created", {"todos": created})
+    return created
+
+@app.post("/todos:batchUpdate", response_model=list[BatchItemResult])
+async def batch_update_todos(batch: TodoBatchUpdate):
+    if not batch.items:
+        return []
+    found = await db_write(repository.update_todos, [(item.title, item.completed, item.id) for item in batch.items])
+    if found:
+        broker.publish("updated", {"todos": list(found.values())})
+    return [
+        {"id": item.id, "status": 200, "todo": found[item.id]} if item.id in found
+        else {"id": item.id, "status": 404}
+        for item in batch.items
+    ]
+
+@app.post("/todos:batchDelete", response_model=list[BatchItemResult])
+async def batch_delete_todos(batch: TodoBatchDelete):
+    if not batch.ids:
+        return []
+    deleted = await db_write(repository.delete_todos, batch.ids)
+    if deleted:
+        broker.publish("deleted", {"ids": sorted(deleted)})
+    return [
+        {"id": todo_id, "status": 200 if todo_id in deleted else 404}
+        for todo_id in batch.ids
+    ]
 
 @app.put("/todos/{todo_id}", response_model=TodoResponse)
-def update_todo(todo_id: int, todo: TodoUpdate):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if exists
-    existing = cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,)).fetchone()
-    if not existing:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Todo not found")
-    
-    # Update fields dynamically
-    update_data = todo.model_dump(exclude_unset=True)
-    if not update_data:
-        conn.close()
-        return dict(existing)
-        
-    query_parts = []
-    params = []
-    for key, value in update_data.items():
-        query_parts.append(f"{key} = ?")
-        params.append(value)
-    
-    params.append(todo_id)
-    query = f"UPDATE todos SET {', '.join(query_parts)} WHERE id = ?"
-    
-    cursor.execute(query, tuple(params))
-    conn.commit()
-    
-    # Fetch updated
-    updated = cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,)).fetchone()
-    conn.close()
-    return dict(updated)
+async def update_todo(todo_id: int, todo: TodoUpdate):
+    updated = await db_write(repository.update_todo, todo_id, todo.title, todo.completed)
+    broker.publish("updated", {"todos": [updated]})
+    return updated
 
+@app.delete("/todos/{todo_id}")
+async def delete_todo(todo_id: int):
+    await db_write(repository.delete_todo, todo_id)
+    broker.publish("deleted", {"ids": [todo_id]})
     return {"message": "Todo deleted"}
 
 @app.post("/todos/{todo_id}/toggle-timer", response_model=TodoResponse)
-def toggle_timer(todo_id: int):
-    import time
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    existing = cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,)).fetchone()
-    if not existing:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Todo not found")
-        
-    todo = dict(existing)
-    now = time.time()
-    
-    if todo["last_started_at"]:
-        # STOP Timer
-        elapsed = int(now - todo["last_started_at"])
-        new_time = todo["time_spent"] + elapsed
-        cursor.execute("UPDATE todos SET time_spent = ?, last_started_at = NULL WHERE id = ?", (new_time, todo_id))
-    else:
-        # START Timer
-        cursor.execute("UPDATE todos SET last_started_at = ? WHERE id = ?", (now, todo_id))
-        
-    conn.commit()
-    updated = cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,)).fetchone()
-    conn.close()
-    
-    result = dict(updated)
-    result["is_running"] = result["last_started_at"] is not None
-    return result
+async def toggle_timer(todo_id: int):
+    updated = await db_write(repository.toggle_timer, todo_id)
+    broker.publish("timer", {"todos": [updated]})
+    return updated
+
+MAX_REPORT_DAYS = 366
+
+@app.get("/reports/daily", response_model=TimeReport)
+async def daily_time_report(start: date, end: date):
+    """Tracked time per UTC day, answered from the timer_daily rollup."""
+    if end < start:
+        raise HTTPException(status_code=422, detail="end must not be before start")
+    if (end - start).days >= MAX_REPORT_DAYS:
+        raise HTTPException(status_code=422, detail=f"Range is limited to {MAX_REPORT_DAYS} days")
+
+    by_day = await db_read(repository.daily_totals, start.isoformat(), end.isoformat())
+    days = []
+    for offset in range((end - start).days + 1):
+        day = (start + timedelta(days=offset)).isoformat()
+        seconds, sessions = by_day.get(day, (0, 0))
+        days.append({"day": day, "seconds": seconds, "sessions": sessions})
+    return {
+        "start": start,
+        "end": end,
+        "total_seconds": sum(d["seconds"] for d in days),
+        "days": days,
+    }
@@ -0,0 +1,86 @@
+"""
+Periodic background jobs started by the app lifespan.
+
+Each job runs in its own asyncio task and does its database work through
+``db_write``, so it queues behind requests instead of competing for the
+writer connection. Every worker process runs the jobs; they are idempotent,
+so overlapping runs only cost a little redundant work.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+import metrics
+import repository
+from events import broker
+from executor import db_write
+
+# Tombstones are kept this long; a client offline for longer must resync
+CHANGES_RETENTION_DAYS = float(os.environ.get("TODO_CHANGES_RETENTION_DAYS", "30"))
+CHANGES_COMPACT_INTERVAL = float(os.environ.get("TODO_CHANGES_COMPACT_INTERVAL", "3600"))
+
+# Timers running longer than this many seconds are stopped and credited
+# exactly this long; 0 disables the sweep
+IDLE_TIMER_LIMIT = int(os.environ.get("TODO_IDLE_TIMER_LIMIT", str(8 * 3600)))
+IDLE_TIMER_SWEEP_INTERVAL = float(os.environ.get("TODO_IDLE_TIMER_SWEEP_INTERVAL", "60"))
+# Timers stopped per UPDATE (and per transaction) within one sweep
+IDLE_TIMER_BATCH = 1000
+
+logger = logging.getLogger("todo.maintenance")
+
+
+async def compact_changes():
+    """Expire old tombstones from the change log; return how many were removed."""
+    cutoff = time.time() - CHANGES_RETENTION_DAYS * 86400
+    return await db_write(repository.expire_tombstones, cutoff)
+
+
+async def stop_idle_timers():
+    """Stop timers running longer than IDLE_TIMER_LIMIT; return how many were stopped.
+
+    Each batch is one UPDATE in its own transaction, published as a
+    ``timer`` event like a manual stop.
+    """
+    start = time.perf_counter()
+    cutoff = time.time() - IDLE_TIMER_LIMIT
+    stopped = 0
+    while True:
+        todos = await db_write(repository.stop_idle_timers, cutoff, IDLE_TIMER_LIMIT, IDLE_TIMER_BATCH)
+        if todos:
+            stopped += len(todos)
+            metrics.idle_timers_stopped.inc(amount=len(todos))
+            broker.publish("timer", {"todos": todos})
+        if len(todos) < IDLE_TIMER_BATCH:
+            break
+    metrics.idle_sweep_duration.observe(time.perf_counter() - start)
+    if stopped:
+        logger.info("stopped %d idle timers", stopped)
+    return stopped
+
+
+async def run_periodically(job, interval):
+    """Run ``job()`` every ``interval`` seconds until cancelled, logging failures."""
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("%s failed", job.__name__)
+        await asyncio.sleep(interval)
+
+
+def start_jobs():
+    """Start the background jobs; return their tasks for cancellation at shutdown."""
+    tasks = [asyncio.create_task(run_periodically(compact_changes, CHANGES_COMPACT_INTERVAL))]
+    if IDLE_TIMER_LIMIT > 0:
+        tasks.append(asyncio.create_task(run_periodically(stop_idle_timers, IDLE_TIMER_SWEEP_INTERVAL)))
+    return tasks
+
+
+async def stop_jobs(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
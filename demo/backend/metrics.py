@@ -0,0 +1,207 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain objects guarded by a lock, so they
+can be updated from the event loop and from database threads alike.
+Collectors registered with ``registry.collector`` are called at scrape time
+to export stats that other components already keep (pools, executors,
+writer). Each uvicorn worker keeps its own registry, so with several
+workers a scrape reports the worker that happened to answer it.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Recording is on by default; TODO_METRICS=0 removes the middleware and the
+# per-statement database counters.
+ENABLED = os.environ.get("TODO_METRICS", "1") == "1"
+
+# Seconds; fine-grained at the low end where most requests land
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            # Export unlabelled series as 0 before the first increment
+            self._values[()] = 0
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket counts (the +Inf bucket last) and the sum
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            values = [(k, list(counts), total) for k, (counts, total) in self._values.items()]
+        lines = self.header()
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, fn):
+        """Register ``fn() -> [(name, kind, help, [(labels_dict, value), ...]), ...]``."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "todo_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_duration = registry.histogram(
+    "todo_http_request_duration_seconds", "HTTP request latency in seconds.", ("method", "route"))
+http_in_flight = registry.gauge(
+    "todo_http_requests_in_flight", "HTTP requests currently being handled.", ("method", "route"))
+db_queries = registry.counter("todo_db_queries_total", "SQL statements executed.")
+db_rows = registry.counter("todo_db_rows_total", "Rows returned by SQL statements.")
+db_commit_duration = registry.histogram("todo_db_commit_duration_seconds", "COMMIT latency in seconds.")
+idle_sweep_duration = registry.histogram(
+    "todo_idle_sweep_duration_seconds", "Idle-timer sweep latency in seconds, including its commits.")
+idle_timers_stopped = registry.counter("todo_idle_timers_stopped_total", "Running timers stopped by the idle sweep.")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route request metrics.
+
+    Requests are labelled with the route template (``/todos/{todo_id}``),
+    never the raw path, so the label set stays bounded. The template is
+    resolved with the router's own path patterns before dispatch because the
+    in-flight gauge needs it while the request is running; Starlette only sets
+    ``scope["route"]`` once routing is under way.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+        self._static = {}
+
+    def _template(self, path):
+        template = self._static.get(path)
+        if template is not None:
+            return template
+        for route in self.routes:
+            if route.path_regex.match(path):
+                if not getattr(route, "param_convertors", None):
+                    self._static[path] = route.path
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = (scope["method"], self._template(scope["path"]))
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc(labels)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_duration.observe(time.perf_counter() - start, labels)
+            http_in_flight.dec(labels)
+            http_requests.inc((*labels, str(status)))
@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from datetime import date
+
+from pydantic import BaseModel, Field
+
+MAX_BATCH_SIZE = 10000
 
 class TodoBase(BaseModel):
     title: str
@@ -15,6 +19,60 @@ class TodoResponse(TodoBase):
     id: int
     time_spent: int = 0
     is_running: bool = False
+    # Unix time the running timer was started, None when stopped
+    last_started_at: float | None = None
+    # time_spent plus the running interval, as of when the todo was read
+    effective_time_spent: int = 0
 
     class Config:
         from_attributes = True
+
+class TodoBatchCreate(BaseModel):
+    items: list[TodoCreate] = Field(max_length=MAX_BATCH_SIZE)
+
+class TodoBatchUpdateItem(TodoUpdate):
+    id: int
+
+class TodoBatchUpdate(BaseModel):
+    items: list[TodoBatchUpdateItem] = Field(max_length=MAX_BATCH_SIZE)
+
+class TodoBatchDelete(BaseModel):
+    ids: list[int] = Field(max_length=MAX_BATCH_SIZE)
+
+class BatchItemResult(BaseModel):
+    id: int
+    status: int
+    todo: TodoResponse | None = None
+
+class DailyTime(BaseModel):
+    day: date
+    seconds: int
+    sessions: int
+
+class TimeReport(BaseModel):
+    start: date
+    end: date
+    total_seconds: int
+    days: list[DailyTime]
+
+class TodoChanges(BaseModel):
+    todos: list[TodoResponse]
+    deleted: list[int]
+    cursor: int
+    has_more: bool
+
+class TodoStats(BaseModel):
+    total: int
+    completed: int
+    running: int
+    time_spent: int
+    average_time_spent: float
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportSummary(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
@@ -0,0 +1,434 @@
+"""
+Data access for todos.
+
+Write functions assume the caller owns the transaction (``run_write`` in
+writer.py), so the same function works on a pooled connection and inside a
+group-committed batch.
+"""
+
+import json
+import re
+import sqlite3
+
+# Current Unix time evaluated by SQLite, so timer arithmetic happens inside
+# the UPDATE and concurrent toggles cannot interleave a read-modify-write.
+SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+# time_spent plus the running interval so far, rounded like a stop would
+# round it; a value as of the read, not stored
+EFFECTIVE_TIME_SPENT = f"""(time_spent + CASE WHEN last_started_at IS NULL THEN 0
+    ELSE CAST({SQL_NOW} - last_started_at AS INTEGER) END)"""
+
+# last_started_at as text with all 17 significant digits: json_object() and
+# || would print a REAL with 15, which differs from the stored value and
+# from what Python encoders (msgpack, single-todo JSON) send
+LAST_STARTED_AT_TEXT = "printf('%!.17g', last_started_at)"
+
+TODO_COLUMNS = (
+    "id, title, completed, time_spent, last_started_at, last_started_at IS NOT NULL AS is_running, "
+    f"{EFFECTIVE_TIME_SPENT} AS effective_time_spent"
+)
+
+
+class TodoNotFound(Exception):
+    """Raised when a single-todo operation targets an id that does not exist."""
+
+
+class ChangeLogExpired(Exception):
+    """Raised when a sync cursor predates the change log's horizon."""
+
+
+def todo_from_row(row):
+    """Convert a TODO_COLUMNS row to a dict with SQLite's 0/1 flags as bools."""
+    todo = dict(row)
+    todo["completed"] = bool(todo["completed"])
+    todo["is_running"] = bool(todo["is_running"])
+    return todo
+
+
+def new_todo(todo_id, title, completed):
+    return {
+        "id": todo_id,
+        "title": title,
+        "completed": completed,
+        "time_spent": 0,
+        "last_started_at": None,
+        "is_running": False,
+        "effective_time_spent": 0,
+    }
+
+
+def _page_query(after_id, completed, running, order):
+    """Return the WHERE clause and named parameters of a todo list page."""
+    # Keyset pagination: every filter combination is served by an index that
+    # is already ordered by id (the rowid, idx_todos_completed,
+    # idx_todos_running or, for both filters with running=true,
+    # idx_todos_running_completed), so a page costs O(limit) regardless of
+    # table size. running=false relies on most todos not running.
+    clauses = []
+    params = {}
+    if completed is not None:
+        clauses.append("completed = :completed")
+        params["completed"] = completed
+    if running is not None:
+        clauses.append("last_started_at IS NOT NULL" if running else "last_started_at IS NULL")
+    if after_id is not None:
+        clauses.append("id > :after_id" if order == "asc" else "id < :after_id")
+        params["after_id"] = after_id
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def query_todos(conn, after_id, limit, completed, running, order):
+    """Return one page of todos and the cursor of the next page, if any."""
+    where, params = _page_query(after_id, completed, running, order)
+    query = f"SELECT {TODO_COLUMNS} FROM todos{where} ORDER BY id {order.upper()} LIMIT :limit"
+    # Fetch one extra row to learn whether another page exists
+    todos = conn.execute(query, {**params, "limit": limit + 1}).fetchall()
+
+    next_cursor = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        next_cursor = todos[-1]["id"]
+
+    return [todo_from_row(todo) for todo in todos], next_cursor
+
+
+# A todo as a TodoResponse JSON object, built by SQLite. Only values typed
+# by the schema are written, so the output needs no re-validation.
+TODO_JSON = f"""json_object(
+    'title', title,
+    'completed', json(CASE WHEN completed THEN 'true' ELSE 'false' END),
+    'id', id,
+    'time_spent', time_spent,
+    'is_running', json(CASE WHEN last_started_at IS NULL THEN 'false' ELSE 'true' END),
+    'last_started_at', json(CASE WHEN last_started_at IS NULL THEN 'null' ELSE {LAST_STARTED_AT_TEXT} END),
+    'effective_time_spent', {EFFECTIVE_TIME_SPENT}
+)"""
+
+
+def query_todos_json(conn, after_id, limit, completed, running, order):
+    """Like ``query_todos``, but return the page as encoded JSON bytes.
+
+    SQLite encodes each todo, so no per-row dicts or models are created and
+    the result can be sent (and cached) as is. The third value tells
+    whether the page has a running timer, whose ``effective_time_spent``
+    goes stale as time passes.
+    """
+    where, params = _page_query(after_id, completed, running, order)
+    # The page plus one look-ahead row. The array is joined here rather than
+    # by json_group_array, whose visiting order SQLite leaves undefined
+    # (ORDER BY inside an aggregate needs SQLite 3.44).
+    rows = conn.execute(
+        f"""
+        SELECT {TODO_JSON}, id, last_started_at IS NOT NULL FROM todos{where}
+        ORDER BY id {order.upper()} LIMIT :limit + 1
+        """,
+        {**params, "limit": limit},
+    ).fetchall()
+    page = rows[:limit]
+    next_cursor = page[-1][1] if len(rows) > limit else None
+    body = "[" + ",".join(todo for todo, _, _ in page) + "]"
+    return body.encode(), next_cursor, any(running for _, _, running in page)
+
+
+# A todo as a CSV record with the columns of CSV_HEADER. The title is always
+# quoted (quotes doubled), so commas and line breaks in it survive.
+CSV_HEADER = "id,title,completed,time_spent,is_running,last_started_at,effective_time_spent"
+TODO_CSV = f"""id || ',"' || replace(title, '"', '""') || '",'
+    || CASE WHEN completed THEN 'true' ELSE 'false' END || ',' || time_spent || ','
+    || CASE WHEN last_started_at IS NULL THEN 'false' ELSE 'true' END || ','
+    || CASE WHEN last_started_at IS NULL THEN '' ELSE {LAST_STARTED_AT_TEXT} END || ',' || {EFFECTIVE_TIME_SPENT}"""
+
+
+def query_todo_lines(conn, after_id, limit, completed, running, order, line=TODO_JSON):
+    """Return up to ``limit`` todos as bytes, one ``line`` each, the last id and the row count.
+
+    Lines are built by SQLite like ``query_todos_json`` (``TODO_JSON`` gives
+    NDJSON, ``TODO_CSV`` CSV records) and joined in id order; callers stream
+    a list by passing the returned id back as ``after_id``.
+    """
+    where, params = _page_query(after_id, completed, running, order)
+    rows = conn.execute(
+        f"SELECT {line}, id FROM todos{where} ORDER BY id {order.upper()} LIMIT :limit",
+        {**params, "limit": limit},
+    ).fetchall()
+    body = "".join(f"{text}\n" for text, _ in rows)
+    return body.encode(), rows[-1][1] if rows else None, len(rows)
+
+
+# Broad queries can match most of the table, and bm25 ordering would then
+# rank every match. Only this many of the newest matches are ranked.
+MAX_SEARCH_MATCHES = 1000
+
+
+def search_expression(text):
+    """Turn free text into an FTS5 query matching every word.
+
+    The last word matches as a prefix, so results follow the user's typing.
+    Words are quoted, so FTS5 operators and punctuation in user input are
+    matched literally instead of being parsed. Returns None if ``text`` has
+    no words.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search_todos(conn, expression, limit, offset):
+    """Return one page of todos matching ``expression``, best bm25 rank first."""
+    # The index is walked newest-first (rowid order, no sort) and only the
+    # candidates are ranked and joined to todos
+    todos = conn.execute(
+        f"""
+        SELECT {TODO_COLUMNS} FROM todos
+        JOIN (
+            SELECT rowid, bm25(todos_fts) AS score FROM todos_fts
+            WHERE todos_fts MATCH ? ORDER BY rowid DESC LIMIT ?
+        ) AS hits ON hits.rowid = todos.id
+        ORDER BY hits.score, todos.id DESC
+        LIMIT ? OFFSET ?
+        """,
+        (expression, MAX_SEARCH_MATCHES, limit + 1, offset),
+    ).fetchall()
+
+    next_offset = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        next_offset = offset + limit
+    return [todo_from_row(todo) for todo in todos], next_offset
+
+
+def create_todo(conn: sqlite3.Connection, title, completed):
+    cursor = conn.execute("INSERT INTO todos (title, completed) VALUES (?, ?)", (title, completed))
+    return new_todo(cursor.lastrowid, title, completed)
+
+
+# Batch functions pass ids to SQLite as one JSON array (json_each) so batch
+# size is not bounded by the host-parameter limit.
+
+def create_todos(conn: sqlite3.Connection, items):
+    """Insert ``(title, completed)`` pairs with one executemany."""
+    conn.executemany("INSERT INTO todos (title, completed) VALUES (?, ?)", items)
+    # AUTOINCREMENT hands out consecutive ids while we hold the write lock
+    last_id = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'todos'").fetchone()[0]
+    first_id = last_id - len(items) + 1
+    return [new_todo(first_id + i, title, completed) for i, (title, completed) in enumerate(items)]
+
+
+def insert_todos(conn: sqlite3.Connection, items):
+    """Insert ``(title, completed)`` pairs without building responses; return the count."""
+    return conn.executemany("INSERT INTO todos (title, completed) VALUES (?, ?)", items).rowcount
+
+
+def update_todo(conn: sqlite3.Connection, todo_id, title, completed):
+    # One statement: unset (None) fields keep their value, RETURNING replaces
+    # the existence check and the re-read
+    updated = conn.execute(
+        f"""
+        UPDATE todos SET title = COALESCE(?, title), completed = COALESCE(?, completed)
+        WHERE id = ?
+        RETURNING {TODO_COLUMNS}
+        """,
+        (title, completed, todo_id),
+    ).fetchall()
+    if not updated:
+        raise TodoNotFound(todo_id)
+    return todo_from_row(updated[0])
+
+
+def update_todos(conn: sqlite3.Connection, items):
+    """Apply ``(title, completed, id)`` updates; return the updated todos by id."""
+    conn.executemany(
+        "UPDATE todos SET title = COALESCE(?, title), completed = COALESCE(?, completed) WHERE id = ?",
+        items,
+    )
+    rows = conn.execute(
+        f"SELECT {TODO_COLUMNS} FROM todos WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps([item[2] for item in items]),),
+    ).fetchall()
+    return {row["id"]: todo_from_row(row) for row in rows}
+
+
+def delete_todo(conn: sqlite3.Connection, todo_id):
+    if conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,)).rowcount == 0:
+        raise TodoNotFound(todo_id)
+
+
+def delete_todos(conn: sqlite3.Connection, ids):
+    """Delete ``ids`` with one set-based statement; return the ids that existed."""
+    rows = conn.execute(
+        "DELETE FROM todos WHERE id IN (SELECT value FROM json_each(?)) RETURNING id",
+        (json.dumps(ids),),
+    ).fetchall()
+    return {row["id"] for row in rows}
+
+
+# Credits the timer sessions matching ``{sessions}`` to timer_daily, cut at
+# every UTC midnight they cross: the start day gets the seconds up to its
+# midnight (and the session), each whole day after it 86400, the stop day
+# the rest. Triggers cannot use recursive CTEs, so the functions that stop
+# timers run this in their own transaction.
+ROLL_UP_SESSIONS = """
+WITH RECURSIVE pieces (t, remaining, first) AS (
+    SELECT CAST(started_at AS INTEGER), duration, 1 FROM timer_sessions WHERE {sessions}
+    UNION ALL
+    SELECT (t / 86400 + 1) * 86400, remaining - ((t / 86400 + 1) * 86400 - t), 0
+    FROM pieces WHERE remaining > (t / 86400 + 1) * 86400 - t
+)
+INSERT INTO timer_daily (day, seconds, sessions)
+SELECT date(t, 'unixepoch'), sum(min(remaining, (t / 86400 + 1) * 86400 - t)), sum(first)
+FROM pieces GROUP BY 1
+ON CONFLICT (day) DO UPDATE SET
+    seconds = seconds + excluded.seconds,
+    sessions = sessions + excluded.sessions
+"""
+
+
+def last_session_id(conn: sqlite3.Connection):
+    return conn.execute("SELECT coalesce(max(id), 0) FROM timer_sessions").fetchone()[0]
+
+
+def roll_up_sessions(conn: sqlite3.Connection, sessions, params):
+    conn.execute(ROLL_UP_SESSIONS.format(sessions=sessions), params)
+
+
+def toggle_timer(conn: sqlite3.Connection, todo_id):
+    # SET expressions all see the pre-update row: a running timer is stopped
+    # and its elapsed seconds added, a stopped timer is started.
+    updated = conn.execute(
+        f"""
+        UPDATE todos SET
+            time_spent = CASE WHEN last_started_at IS NULL THEN time_spent
+                ELSE time_spent + CAST({SQL_NOW} - last_started_at AS INTEGER) END,
+            last_started_at = CASE WHEN last_started_at IS NULL THEN {SQL_NOW} END
+        WHERE id = ?
+        RETURNING {TODO_COLUMNS}
+        """,
+        (todo_id,),
+    ).fetchall()
+    if not updated:
+        raise TodoNotFound(todo_id)
+    todo = todo_from_row(updated[0])
+    if not todo["is_running"]:
+        # The stop logged one session: this todo's newest, found on
+        # idx_timer_sessions_todo
+        roll_up_sessions(
+            conn,
+            "id = (SELECT id FROM timer_sessions WHERE todo_id = :todo_id ORDER BY started_at DESC LIMIT 1)",
+            {"todo_id": todo_id},
+        )
+    return todo
+
+
+def any_running(conn):
+    """Return whether any timer is running, from one idx_todos_started_at lookup."""
+    return conn.execute("SELECT 1 FROM todos WHERE last_started_at IS NOT NULL LIMIT 1").fetchone() is not None
+
+
+def running_todos(conn, limit):
+    """Return up to ``limit`` running todos, longest running first."""
+    # idx_todos_started_at holds only running todos, in start order, so this
+    # reads ``limit`` index entries instead of scanning the table
+    rows = conn.execute(
+        f"SELECT {TODO_COLUMNS} FROM todos WHERE last_started_at IS NOT NULL ORDER BY last_started_at LIMIT ?",
+        (limit,),
+    ).fetchall()
+    return [todo_from_row(row) for row in rows]
+
+
+def stop_idle_timers(conn: sqlite3.Connection, cutoff, credit, limit):
+    """Stop up to ``limit`` timers started before ``cutoff``; return them.
+
+    Each is credited ``credit`` seconds rather than the whole time it ran,
+    and its timer session is logged as ending ``credit`` seconds after the
+    start, like any other stop.
+    """
+    # The subquery walks idx_todos_started_at from its oldest entry and
+    # stops at the cutoff, so the cost follows the number of timers stopped
+    sessions_before = last_session_id(conn)
+    rows = conn.execute(
+        f"""
+        UPDATE todos SET time_spent = time_spent + :credit, last_started_at = NULL
+        WHERE id IN (
+            SELECT id FROM todos
+            WHERE last_started_at IS NOT NULL AND last_started_at < :cutoff
+            ORDER BY last_started_at LIMIT :limit
+        )
+        RETURNING {TODO_COLUMNS}
+        """,
+        {"cutoff": cutoff, "credit": credit, "limit": limit},
+    ).fetchall()
+    if rows:
+        roll_up_sessions(conn, "id > :after_id", {"after_id": sessions_before})
+    return [todo_from_row(row) for row in rows]
+
+
+def read_changes(conn, since, limit):
+    """Return todos changed and ids deleted after change ``since``.
+
+    ``since=None`` returns no changes, only the current cursor, which a
+    client takes before its initial full load. Changes are returned oldest
+    first with their current state, so replaying a page twice is harmless.
+    """
+    # One read transaction: the horizon and the log come from one snapshot
+    conn.execute("BEGIN")
+    try:
+        horizon, latest = conn.execute(
+            """
+            SELECT change_horizon, coalesce((SELECT seq FROM sqlite_sequence WHERE name = 'changes'), 0)
+            FROM sync_state WHERE id = 1
+            """
+        ).fetchone()
+        if since is None:
+            return {"todos": [], "deleted": [], "cursor": latest, "has_more": False}
+        # A cursor from before the horizon may have missed an expired
+        # tombstone; one beyond the latest seq belongs to another database
+        if since < horizon or since > latest:
+            raise ChangeLogExpired(since)
+        rows = conn.execute(
+            f"""
+            SELECT changes.seq, changes.todo_id, changes.deleted, {TODO_COLUMNS}
+            FROM changes LEFT JOIN todos ON todos.id = changes.todo_id
+            WHERE changes.seq > ? ORDER BY changes.seq LIMIT ?
+            """,
+            (since, limit + 1),
+        ).fetchall()
+    finally:
+        conn.rollback()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    todos, deleted = [], []
+    for row in rows:
+        if row["deleted"]:
+            deleted.append(row["todo_id"])
+        else:
+            # The row minus the three leading change-log columns
+            todos.append(todo_from_row({key: row[key] for key in row.keys()[3:]}))
+    cursor = rows[-1]["seq"] if has_more else latest
+    return {"todos": todos, "deleted": deleted, "cursor": cursor, "has_more": has_more}
+
+
+def expire_tombstones(conn: sqlite3.Connection, cutoff):
+    """Delete tombstones older than ``cutoff``, advancing the horizon; return the count."""
+    expired = conn.execute(
+        "DELETE FROM changes WHERE deleted AND changed_at < ? RETURNING seq", (cutoff,)
+    ).fetchall()
+    if expired:
+        conn.execute(
+            "UPDATE sync_state SET change_horizon = max(change_horizon, ?) WHERE id = 1",
+            (max(row["seq"] for row in expired),),
+        )
+    return len(expired)
+
+
+def daily_totals(conn: sqlite3.Connection, start, end):
+    """Return ``{day: (seconds, sessions)}`` from the timer_daily rollup."""
+    # One primary-key range scan over at most one row per day
+    rows = conn.execute(
+        "SELECT day, seconds, sessions FROM timer_daily WHERE day BETWEEN ? AND ? ORDER BY day",
+        (start, end),
+    ).fetchall()
+    return {row["day"]: (row["seconds"], row["sessions"]) for row in rows}
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Check the trigger-maintained todo_stats row against the todos table.
+
+Usage:
+    python stats.py          # exit 1 if the summary row has drifted
+    python stats.py --fix    # rewrite the summary row from a full scan
+"""
+
+import argparse
+import sqlite3
+import sys
+
+from database import get_db_connection, init_db, transaction
+
+STAT_FIELDS = ("total", "completed", "running", "time_spent")
+
+RECOMPUTE_SQL = """
+SELECT count(*) AS total,
+       coalesce(sum(completed != 0), 0) AS completed,
+       coalesce(sum(last_started_at IS NOT NULL), 0) AS running,
+       coalesce(sum(time_spent), 0) AS time_spent
+FROM todos
+"""
+
+
+def read_stats(conn: sqlite3.Connection) -> dict:
+    """Return the summary row: an O(1) primary-key lookup."""
+    row = conn.execute(f"SELECT {', '.join(STAT_FIELDS)} FROM todo_stats WHERE id = 1").fetchone()
+    return dict(row)
+
+
+def recompute_stats(conn: sqlite3.Connection) -> dict:
+    """Return the statistics computed from scratch with a full scan."""
+    return dict(conn.execute(RECOMPUTE_SQL).fetchone())
+
+
+def check_stats(conn: sqlite3.Connection) -> dict:
+    """Return {field: (stored, actual)} for every field that disagrees."""
+    # Both reads from one snapshot so a concurrent write cannot skew them. A
+    # deferred read transaction takes no write lock, so writers are not held
+    # up for the length of the scan.
+    conn.execute("BEGIN")
+    try:
+        stored = read_stats(conn)
+        actual = recompute_stats(conn)
+    finally:
+        conn.rollback()
+    return {f: (stored[f], actual[f]) for f in STAT_FIELDS if stored[f] != actual[f]}
+
+
+def fix_stats(conn: sqlite3.Connection) -> dict:
+    with transaction(conn):
+        actual = recompute_stats(conn)
+        conn.execute(
+            "UPDATE todo_stats SET total = ?, completed = ?, running = ?, time_spent = ? WHERE id = 1",
+            tuple(actual[f] for f in STAT_FIELDS),
+        )
+    return actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check todo_stats consistency")
+    parser.add_argument("--fix", action="store_true", help="rewrite the summary row from a full scan")
+    args = parser.parse_args()
+
+    init_db()
+    conn = get_db_connection()
+    try:
+        mismatches = check_stats(conn)
+        if not mismatches:
+            print("✅ todo_stats is consistent")
+            return 0
+        for field, (stored, actual) in mismatches.items():
+            print(f"❌ {field}: stored {stored}, actual {actual}")
+        if args.fix:
+            fix_stats(conn)
+            print("🔧 todo_stats rewritten from todos")
+            return 0
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Opt-in SQL statement tracing and slow-query log (TODO_SQL_TRACE=1).
+
+``install(conn)`` hooks a connection with ``set_trace_callback`` and a
+progress handler. SQLite reports when each statement starts but not when it
+ends, so a statement is timed from its start until the next statement on the
+same connection starts or until ``finish(conn)`` is called (on pool release
+and at the end of each transaction). That span includes fetching the rows, which is the
+cost the caller sees. The progress handler counts virtual-machine steps, a
+measure of work done that does not depend on machine load: a full table scan
+shows up as a large step count even when it is still fast.
+
+Statements are aggregated by fingerprint, the SQL with literals replaced by
+``?``. A statement slower than TODO_SQL_SLOW_MS is logged to the
+``todo.sql`` logger with its ``EXPLAIN QUERY PLAN``. The plan is captured
+in ``finish``, outside any statement, because SQLite callbacks must not use
+their own connection.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+
+ENABLED = os.environ.get("TODO_SQL_TRACE", "0") == "1"
+SLOW_MS = float(os.environ.get("TODO_SQL_SLOW_MS", "50"))
+# VM instructions between progress-handler calls; lower is finer but slower
+PROGRESS_STEPS = int(os.environ.get("TODO_SQL_PROGRESS_STEPS", "1000"))
+
+logger = logging.getLogger("todo.sql")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so statements differing only in literals group together."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?, ...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class _Trace:
+    """Per-connection state: the statement currently being timed."""
+
+    __slots__ = ("sql", "started", "steps", "slow", "explaining")
+
+    def __init__(self):
+        self.sql = None
+        self.started = 0.0
+        self.steps = 0
+        self.slow = []
+        self.explaining = False
+
+
+class Tracer:
+    def __init__(self, slow_ms=SLOW_MS):
+        self.slow_seconds = slow_ms / 1000
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.slow_statements = 0
+
+    def install(self, conn):
+        trace = conn._sql_trace = _Trace()
+
+        def on_statement(sql):
+            # Each trigger program a statement fires is reported again with
+            # the parent statement's text (or as "-- TRIGGER name"); its cost
+            # belongs to that statement. An identical statement run twice in a
+            # row is therefore timed as one.
+            if trace.explaining or sql == trace.sql or sql.startswith("--"):
+                return
+            self._end(trace)
+            trace.sql = sql
+            trace.steps = 0
+            trace.started = time.perf_counter()
+
+        def on_progress():
+            trace.steps += PROGRESS_STEPS
+            return 0
+
+        conn.set_trace_callback(on_statement)
+        conn.set_progress_handler(on_progress, PROGRESS_STEPS)
+
+    def _end(self, trace):
+        if trace.sql is None:
+            return
+        elapsed = time.perf_counter() - trace.started
+        key = fingerprint(trace.sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {"count": 0, "time": 0.0, "max_time": 0.0, "vm_steps": 0}
+            stats["count"] += 1
+            stats["time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            stats["vm_steps"] += trace.steps
+        if elapsed >= self.slow_seconds:
+            trace.slow.append((trace.sql, elapsed, trace.steps))
+        trace.sql = None
+
+    def finish(self, conn):
+        """End the current statement on ``conn`` and log any slow ones."""
+        trace = getattr(conn, "_sql_trace", None)
+        if trace is None:
+            return
+        self._end(trace)
+        if not trace.slow:
+            return
+        slow, trace.slow = trace.slow, []
+        for sql, elapsed, steps in slow:
+            self.slow_statements += 1
+            logger.warning(
+                "slow statement %.1f ms, ~%d VM steps: %s\n  plan: %s",
+                elapsed * 1000, steps, sql, self._plan(conn, trace, sql),
+            )
+
+    def _plan(self, conn, trace, sql):
+        if not sql.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")):
+            return "-"
+        trace.explaining = True
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        except Exception as exc:
+            return f"unavailable ({exc})"
+        finally:
+            trace.explaining = False
+        return "; ".join(row[3] for row in rows) or "-"
+
+    def stats(self, top=50):
+        """Return the ``top`` fingerprints by total time."""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1]["time"], reverse=True)[:top]
+        return {
+            "enabled": ENABLED,
+            "slow_ms": self.slow_seconds * 1000,
+            "slow_statements": self.slow_statements,
+            "statements": [
+                {
+                    "fingerprint": key,
+                    "count": s["count"],
+                    "time_total": round(s["time"], 6),
+                    "time_mean": round(s["time"] / s["count"], 6),
+                    "time_max": round(s["max_time"], 6),
+                    "vm_steps_mean": s["vm_steps"] // s["count"],
+                }
+                for key, s in items
+            ],
+        }
+
+
+tracer = Tracer()
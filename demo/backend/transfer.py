@@ -0,0 +1,99 @@
+"""
+Streaming bulk export and import of todos.
+
+Export reads the table in keyset chunks, each with its own pooled
+connection, rather than holding one cursor open across the download: an
+open cursor would pin a connection and a read snapshot (and with it the
+WAL) for as long as the slowest client takes. Import parses the upload as
+it arrives and commits every IMPORT_CHUNK valid todos in one transaction,
+so memory is bounded by one chunk whatever the file size.
+"""
+
+import os
+
+import formats
+import repository
+from events import broker
+from executor import db_read, db_write
+
+# Rows read per connection checkout while streaming
+STREAM_CHUNK = int(os.environ.get("TODO_STREAM_CHUNK", "1000"))
+# Valid rows committed per import transaction
+IMPORT_CHUNK = int(os.environ.get("TODO_IMPORT_CHUNK", "5000"))
+# Rejected records listed in an import summary; later ones are only counted
+MAX_IMPORT_ERRORS = 100
+
+EXPORT_LINES = {formats.NDJSON: repository.TODO_JSON, formats.CSV: repository.TODO_CSV}
+
+
+async def stream_todos(after_id, limit, completed, running, order, line=repository.TODO_JSON):
+    """Yield chunks of todo lines until ``limit`` todos (or all of them) are sent.
+
+    Each chunk continues after the last id sent, so memory does not grow
+    with the list. Todos committed during the download appear if their id
+    is still ahead of the cursor.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = STREAM_CHUNK if remaining is None else min(STREAM_CHUNK, remaining)
+        body, after_id, count = await db_read(
+            repository.query_todo_lines, after_id, size, completed, running, order, line
+        )
+        if count:
+            yield body
+        if count < size:
+            return
+        if remaining is not None:
+            remaining -= count
+
+
+async def export_todos(media_type, completed, running):
+    """Yield the whole (filtered) table as NDJSON, or CSV with a header row."""
+    if media_type == formats.CSV:
+        yield (repository.CSV_HEADER + "\n").encode()
+    async for chunk in stream_todos(None, None, completed, running, "asc", EXPORT_LINES[media_type]):
+        yield chunk
+
+
+class ImportAborted(Exception):
+    """The upload became unreadable; earlier chunks stay committed."""
+
+    def __init__(self, error, summary):
+        super().__init__(str(error))
+        self.line = error.line
+        self.reason = error.reason
+        self.summary = summary
+
+
+async def import_todos(chunks, media_type):
+    """Create todos from an NDJSON or CSV byte stream; return the import summary.
+
+    Invalid records are skipped and reported. After each committed chunk an
+    ``imported`` event with the running totals is published, the last one
+    with ``done`` set; clients pick up the new todos with delta sync.
+    """
+    summary = {"imported": 0, "failed": 0, "errors": []}
+    batch = []
+
+    async def commit():
+        summary["imported"] += await db_write(repository.insert_todos, batch)
+        batch.clear()
+        broker.publish("imported", {"imported": summary["imported"], "failed": summary["failed"], "done": False})
+
+    try:
+        async for line, todo in formats.read_todos(chunks, media_type):
+            if isinstance(todo, str):
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_IMPORT_ERRORS:
+                    summary["errors"].append({"line": line, "error": todo})
+                continue
+            batch.append((todo.title, todo.completed))
+            if len(batch) >= IMPORT_CHUNK:
+                await commit()
+        if batch:
+            await commit()
+    except formats.MalformedUpload as exc:
+        raise ImportAborted(exc, summary) from exc
+    finally:
+        broker.publish("imported", {"imported": summary["imported"], "failed": summary["failed"], "done": True})
+    return summary
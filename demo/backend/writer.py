@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database import get_db_connection, transaction, write_pool
+
+# Group commit is opt-in. With it enabled every mutation is executed by one
+# writer thread that commits whole batches, so concurrent requests share a
+# single fsync and never contend for the SQLite write lock.
+GROUP_COMMIT = os.environ.get("TODO_GROUP_COMMIT", "0") == "1"
+# Upper bounds on a batch: operations per commit, and how long the writer may
+# wait for more operations once it has one. 0 means commit whatever is
+# already queued, which adds no latency at low load.
+MAX_BATCH = int(os.environ.get("TODO_WRITER_MAX_BATCH", "256"))
+MAX_DELAY_MS = float(os.environ.get("TODO_WRITER_MAX_DELAY_MS", "0"))
+# Operations allowed to wait for the writer; once it is full, new writes are
+# refused at once instead of making the caller wait for room
+QUEUE_SIZE = int(os.environ.get("TODO_WRITER_QUEUE_SIZE", "10000"))
+# Durability of the writer connection (FULL, NORMAL or OFF); defaults to the
+# storage profile's setting
+SYNCHRONOUS = os.environ.get("TODO_WRITER_SYNCHRONOUS", "").upper() or None
+
+_STOP = object()
+
+
+class WriterOverloaded(Exception):
+    """Raised when QUEUE_SIZE operations are already waiting for the writer."""
+
+
+class GroupCommitWriter:
+    """Single writer thread that coalesces mutations into shared transactions.
+
+    ``submit(fn, *args)`` queues ``fn(conn, *args)`` and returns a Future.
+    The writer drains up to ``max_batch`` queued operations, runs each in
+    its own SAVEPOINT (so one failing operation does not undo the others)
+    and commits them together. Futures are resolved only after the commit,
+    so a caller never sees a result that is not yet durable.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, max_delay_ms=MAX_DELAY_MS,
+                 queue_size=QUEUE_SIZE, synchronous=SYNCHRONOUS):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.synchronous = synchronous
+        self._queue = queue.Queue(queue_size)
+        self._thread = None
+        self._conn = None
+        self.batches = 0
+        self.operations = 0
+        self.failed_commits = 0
+        self.commit_time = 0.0
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        self._conn = get_db_connection()
+        if self.synchronous:
+            self._conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self._conn.close()
+
+    def submit(self, fn, *args):
+        # Called from the event loop, so it must never block
+        future = Future()
+        try:
+            self._queue.put_nowait((future, fn, args))
+        except queue.Full:
+            raise WriterOverloaded("Write queue is full") from None
+        return future
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        conn = self._conn
+        outcomes = []
+        start = time.perf_counter()
+        try:
+            with transaction(conn):
+                for future, fn, args in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT op")
+                    try:
+                        result = fn(conn, *args)
+                    except Exception as exc:
+                        conn.execute("ROLLBACK TO op")
+                        outcomes.append((future, None, exc))
+                    else:
+                        outcomes.append((future, result, None))
+                    conn.execute("RELEASE op")
+        except Exception as exc:
+            # The commit itself failed: nothing in the batch was applied
+            self.failed_commits += 1
+            for future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        self.batches += 1
+        self.operations += len(outcomes)
+        self.commit_time += time.perf_counter() - start
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+    def stats(self):
+        return {
+            "enabled": self.running,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "operations": self.operations,
+            "average_batch": round(self.operations / self.batches, 2) if self.batches else 0.0,
+            "failed_commits": self.failed_commits,
+            "commit_time_total": round(self.commit_time, 6),
+        }
+
+
+writer = GroupCommitWriter()
+
+
+def run_write(fn, *args):
+    """Run ``fn(conn, *args)`` in a write transaction and return its result.
+
+    Goes through the group-commit writer when it is running, otherwise
+    borrows the pooled writer connection and commits on its own.
+    """
+    if writer.running:
+        return writer.submit(fn, *args).result()
+    with write_pool.connection() as conn:
+        with transaction(conn):
+            return fn(conn, *args)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare GET /todos latency with the list cache enabled and disabled.
+
+Runs the FastAPI app in-process against a seeded database and requests a
+small set of hot pages repeatedly, then prints p50/p99 for both modes.
+
+Usage:
+    python benchmarks/bench_cache.py [--rows 100000] [--requests 2000]
+"""
+
+import argparse
+import random
+import time
+
+from common import load_backend, percentiles, print_table, seed, temp_db_path
+
+HOT_QUERIES = [
+    {"limit": 100},
+    {"limit": 100, "completed": "true"},
+    {"limit": 500, "order": "desc"},
+    {"limit": 100, "running": "true"},
+]
+
+
+def run(client, requests_count):
+    rng = random.Random(42)
+    samples = []
+    for _ in range(requests_count):
+        params = rng.choice(HOT_QUERIES)
+        start = time.perf_counter()
+        res = client.get("/todos", params=params)
+        samples.append(time.perf_counter() - start)
+        assert res.status_code == 200
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    app_module = load_backend(db_path)
+    seed(db_path, args.rows)
+
+    from fastapi.testclient import TestClient
+
+    results = []
+    with TestClient(app_module.app) as client:
+        cache = app_module.list_cache
+        for label, size in (("uncached", 0), ("cached", cache.maxsize or 256)):
+            cache.maxsize = size
+            cache.clear()
+            run(client, 100)  # warm up
+            results.append({"mode": label, **percentiles(run(client, args.requests))})
+        print(f"{args.rows} rows, {args.requests} requests per mode")
+        print_table(results, ["mode", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+        print("cache:", cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark every HTTP route in-process on seeded datasets.
+
+The FastAPI app is driven through ``httpx.ASGITransport`` (no server, no
+sockets), with its lifespan running, against databases seeded with each
+``--sizes`` row count. Every route is called ``--iterations`` times after a
+short warm-up and the benchmark reports throughput and p50/p95/p99 per
+route and dataset. Each dataset runs in a fresh subprocess because the
+backend reads its configuration at import time.
+
+Write routes keep the dataset size stable: the deletes remove exactly the
+todos the creates added. ``/todos/events`` is a long-lived stream and is
+not measured here.
+
+``--save`` writes the results as a JSON baseline; ``--compare`` reruns the
+baseline's sizes and exits 1 if any route's p99 or throughput regressed by
+more than ``--threshold``.
+
+Usage:
+    python benchmarks/bench_endpoints.py [--sizes 1000,100000,1000000] [--iterations 300]
+    python benchmarks/bench_endpoints.py --save benchmarks/baseline.json
+    python benchmarks/bench_endpoints.py --compare benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from common import load_backend, percentiles, print_table, seed, temp_db_path
+
+DEFAULT_SIZES = "1000,100000,1000000"
+WARMUP = 20
+BATCH_SIZE = 10
+
+
+def routes(rows, rng, created, batch_created):
+    """Yield ``(name, request_factory)``; each factory returns ``(method, url, kwargs)``."""
+    some_id = lambda: rng.randint(1, rows)
+    batch_ids = lambda: [some_id() for _ in range(BATCH_SIZE)]
+
+    yield "GET /", lambda: ("GET", "/", {})
+    yield "GET /debug/pool", lambda: ("GET", "/debug/pool", {})
+    yield "GET /todos", lambda: ("GET", "/todos", {"params": {"after_id": rng.randint(0, rows)}})
+    yield "GET /todos?completed", lambda: ("GET", "/todos", {"params": {"completed": "true", "after_id": rng.randint(0, rows)}})
+    yield "GET /todos?running", lambda: ("GET", "/todos", {"params": {"running": "true"}})
+    yield "GET /todos?order=desc", lambda: ("GET", "/todos", {"params": {"order": "desc", "limit": 1000}})
+    # Pages with a running timer are never revalidated, so ask for one without
+    yield "GET /todos (304)", lambda: ("GET", "/todos", {"params": {"running": "false"}, "headers": {"If-None-Match": "*"}})
+    yield "GET /todos/running", lambda: ("GET", "/todos/running", {})
+    yield "GET /todos/stats", lambda: ("GET", "/todos/stats", {})
+    yield "GET /todos/changes", lambda: ("GET", "/todos/changes", {"params": {"since": rows - 100}})
+    yield "GET /todos/search", lambda: ("GET", "/todos/search", {"params": {"q": f"todo {some_id()}"}})
+    yield "GET /reports/daily", lambda: ("GET", "/reports/daily", {"params": {"start": "2024-01-01", "end": "2024-12-31"}})
+    yield "POST /todos", lambda: ("POST", "/todos", {"json": {"title": "Benchmark todo"}})
+    yield "POST /todos:batchCreate", lambda: (
+        "POST", "/todos:batchCreate", {"json": {"items": [{"title": "Benchmark todo"}] * BATCH_SIZE}})
+    yield "PUT /todos/{id}", lambda: ("PUT", f"/todos/{some_id()}", {"json": {"completed": rng.random() < 0.5}})
+    yield "POST /todos:batchUpdate", lambda: (
+        "POST", "/todos:batchUpdate", {"json": {"items": [{"id": i, "title": "Updated"} for i in batch_ids()]}})
+    yield "POST /todos/{id}/toggle-timer", lambda: ("POST", f"/todos/{some_id()}/toggle-timer", {})
+    yield "DELETE /todos/{id}", lambda: ("DELETE", f"/todos/{created.pop()}", {})
+    yield "POST /todos:batchDelete", lambda: (
+        "POST", "/todos:batchDelete", {"json": {"ids": [batch_created.pop() for _ in range(BATCH_SIZE)]}})
+
+
+async def measure(args):
+    db_path = temp_db_path()
+    main_module = load_backend(db_path)
+    seed(db_path, args.rows)
+    import httpx
+
+    rng = random.Random(42)
+    created, batch_created = [], []
+    results = []
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with main_module.lifespan(main_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, request in routes(args.rows, rng, created, batch_created):
+                samples = []
+                started = None
+                for i in range(WARMUP + args.iterations):
+                    if i == WARMUP:
+                        started = time.perf_counter()
+                    method, url, kwargs = request()
+                    start = time.perf_counter()
+                    res = await client.request(method, url, **kwargs)
+                    elapsed = time.perf_counter() - start
+                    assert res.status_code in (200, 304), (name, res.status_code, res.text)
+                    if name == "POST /todos":
+                        created.append(res.json()["id"])
+                    elif name == "POST /todos:batchCreate":
+                        batch_created.extend(todo["id"] for todo in res.json())
+                    if i >= WARMUP:
+                        samples.append(elapsed)
+                total = time.perf_counter() - started
+                summary = percentiles(samples)
+                results.append({
+                    "rows": args.rows,
+                    "route": name,
+                    "ops_per_sec": round(len(samples) / total),
+                    **{k: summary[k] for k in ("p50_ms", "p95_ms", "p99_ms")},
+                })
+    print(json.dumps(results))
+
+
+def compare(baseline, results, threshold):
+    """Annotate ``results`` with changes against ``baseline``; return the regressions."""
+    previous = {(r["rows"], r["route"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["rows"], result["route"]))
+        if before is None:
+            result["change"] = "new"
+            continue
+        p99 = result["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        ops = result["ops_per_sec"] / before["ops_per_sec"] - 1 if before["ops_per_sec"] else 0.0
+        result["change"] = f"p99 {p99:+.0%}, ops {ops:+.0%}"
+        if p99 > threshold or ops < -threshold:
+            result["change"] += "  REGRESSION"
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=None, help=f"comma-separated row counts (default {DEFAULT_SIZES})")
+    parser.add_argument("--iterations", type=int, default=300, help="measured requests per route")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rows:
+        asyncio.run(measure(args))
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    sizes = args.sizes or (",".join(map(str, baseline["sizes"])) if baseline else DEFAULT_SIZES)
+    sizes = [int(size) for size in sizes.split(",")]
+
+    results = []
+    for rows in sizes:
+        out = subprocess.run(
+            [sys.executable, __file__, "--rows", str(rows), "--iterations", str(args.iterations)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.extend(json.loads(out.splitlines()[-1]))
+
+    columns = ["rows", "route", "ops_per_sec", "p50_ms", "p95_ms", "p99_ms"]
+    regressions = []
+    if baseline:
+        regressions = compare(baseline, results, args.threshold)
+        columns.append("change")
+    print(f"{args.iterations} requests per route")
+    print_table(results, columns)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "sizes": sizes,
+                "iterations": args.iterations,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.save}")
+    if regressions:
+        print(f"{len(regressions)} route(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare the GET /todos response formats and NDJSON streaming memory.
+
+For each ``--sizes`` row count, in a fresh subprocess with the app driven
+in-process through ``httpx.ASGITransport``:
+
+* Body bytes per todo and p50 latency of a ``--limit`` page as JSON,
+  MessagePack (when ``msgpack`` is installed) and NDJSON, list cache off.
+* Streaming the whole table as NDJSON: total bytes, time, and the peak
+  memory traced by tracemalloc while the body is read in chunks. The peak
+  should not grow with the table.
+
+Usage:
+    python benchmarks/bench_formats.py [--sizes 100000,1000000] [--limit 1000] [--requests 100]
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from common import load_backend, percentiles, print_table, seed, stream_get, temp_db_path
+
+
+async def measure(args):
+    db_path = temp_db_path()
+    main_module = load_backend(db_path)
+    seed(db_path, args.rows)
+    import formats
+    import httpx
+
+    main_module.list_cache.maxsize = 0
+    results = []
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with main_module.lifespan(main_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for media_type in formats.available():
+                samples, size = [], 0
+                for i in range(args.requests):
+                    params = {"after_id": i * 7, "limit": args.limit}
+                    start = time.perf_counter()
+                    res = await client.get("/todos", params=params, headers={"Accept": media_type})
+                    samples.append(time.perf_counter() - start)
+                    assert res.status_code == 200, res.text
+                    size = len(res.content)
+                results.append({
+                    "rows": args.rows,
+                    "test": f"page of {args.limit}",
+                    "format": media_type,
+                    "bytes_per_todo": round(size / args.limit, 1),
+                    "p50_ms": percentiles(samples)["p50_ms"],
+                })
+
+            started = time.perf_counter()
+            tracemalloc.start()
+            total = await stream_get(main_module.app, "/todos", [("Accept", formats.NDJSON)])
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append({
+                "rows": args.rows,
+                "test": "stream all",
+                "format": formats.NDJSON,
+                "bytes_per_todo": round(total / args.rows, 1),
+                "p50_ms": round((time.perf_counter() - started) * 1000),
+                "peak_kib": round(peak / 1024),
+            })
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100000,1000000", help="comma-separated row counts")
+    parser.add_argument("--limit", type=int, default=1000, help="rows per page")
+    parser.add_argument("--requests", type=int, default=100, help="page requests per format")
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rows:
+        asyncio.run(measure(args))
+        return
+
+    results = []
+    for rows in args.sizes.split(","):
+        out = subprocess.run(
+            [sys.executable, __file__, "--rows", rows, "--limit", str(args.limit), "--requests", str(args.requests)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.extend(json.loads(out.splitlines()[-1]))
+    print("p50_ms is the total time for 'stream all'")
+    print_table(results, ["rows", "test", "format", "bytes_per_todo", "p50_ms", "peak_kib"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measure the overhead of metrics recording (TODO_METRICS=1 vs 0).
+
+Runs the same seeded mix of list pages, single-todo updates and timer
+toggles in-process through ``httpx.ASGITransport``, once with the metrics
+middleware and database counters and once without, each in a fresh
+subprocess. Reports ops/sec, p50 and p99 per mode and the relative cost.
+
+Usage:
+    python benchmarks/bench_metrics.py [--rows 100000] [--requests 3000]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from common import load_backend, percentiles, print_table, seed, temp_db_path
+
+
+async def measure(args):
+    db_path = temp_db_path()
+    main_module = load_backend(db_path, TODO_METRICS=args.metrics)
+    seed(db_path, args.rows)
+    import httpx
+
+    rng = random.Random(42)
+    transport = httpx.ASGITransport(app=main_module.app)
+    samples = []
+    async with main_module.lifespan(main_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for i in range(100 + args.requests):
+                roll = rng.random()
+                if roll < 0.6:
+                    request = client.get("/todos", params={"after_id": rng.randint(0, args.rows)})
+                elif roll < 0.8:
+                    request = client.put(f"/todos/{rng.randint(1, args.rows)}", json={"completed": True})
+                else:
+                    request = client.post(f"/todos/{rng.randint(1, args.rows)}/toggle-timer")
+                if i == 100:
+                    started = time.perf_counter()
+                start = time.perf_counter()
+                res = await request
+                if i >= 100:
+                    samples.append(time.perf_counter() - start)
+                assert res.status_code == 200, res.text
+            elapsed = time.perf_counter() - started
+    summary = percentiles(samples)
+    print(json.dumps({
+        "metrics": "on" if args.metrics == "1" else "off",
+        "ops_per_sec": round(len(samples) / elapsed),
+        "p50_ms": summary["p50_ms"],
+        "p99_ms": summary["p99_ms"],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--metrics", choices=["0", "1"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.metrics:
+        asyncio.run(measure(args))
+        return
+
+    results = []
+    for mode in ("0", "1"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--metrics", mode, "--rows", str(args.rows), "--requests", str(args.requests)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out.splitlines()[-1]))
+    off, on = results
+    on["overhead"] = f"{off['ops_per_sec'] / on['ops_per_sec'] - 1:+.1%}"
+    print(f"{args.rows} rows, {args.requests} requests per mode")
+    print_table(results, ["metrics", "ops_per_sec", "p50_ms", "p99_ms", "overhead"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare the SQLite storage profiles on the same mixed workload.
+
+For each profile (TODO_DB_PROFILE) a fresh subprocess seeds a database and
+runs a fixed, seeded sequence of operations through the repository layer:
+list pages at random cursors on the read-only pool, and creates and timer
+toggles committed one by one on the writer connection. It reports ops/sec
+and latency percentiles per profile, overall and for writes alone (where
+the synchronous setting shows up).
+
+Usage:
+    python benchmarks/bench_profiles.py [--rows 100000] [--ops 5000] [--write-ratio 0.3]
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+from common import load_backend, percentiles, print_table, seed, temp_db_path
+
+PROFILES = ["durable", "balanced", "throughput"]
+
+
+def measure(args):
+    db_path = temp_db_path()
+    load_backend(db_path, TODO_DB_PROFILE=args.profile)
+    seed(db_path, args.rows)
+    import repository
+    from database import read_pool
+    from writer import run_write
+
+    rng = random.Random(42)
+    reads, writes = [], []
+    started = time.perf_counter()
+    for _ in range(args.ops):
+        start = time.perf_counter()
+        if rng.random() < args.write_ratio:
+            if rng.random() < 0.5:
+                run_write(repository.create_todo, "Benchmark todo", False)
+            else:
+                run_write(repository.toggle_timer, rng.randint(1, args.rows))
+            writes.append(time.perf_counter() - start)
+        else:
+            with read_pool.connection() as conn:
+                repository.query_todos(conn, rng.randint(0, args.rows), 100, None, None, "asc")
+            reads.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    overall = percentiles(reads + writes)
+    print(json.dumps({
+        "profile": args.profile,
+        "ops_per_sec": round(args.ops / elapsed),
+        "p50_ms": overall["p50_ms"],
+        "p99_ms": overall["p99_ms"],
+        "read_p99_ms": percentiles(reads)["p99_ms"] if reads else "",
+        "write_p99_ms": percentiles(writes)["p99_ms"] if writes else "",
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        measure(args)
+        return
+
+    results = []
+    for profile in PROFILES:
+        out = subprocess.run(
+            [sys.executable, __file__, "--profile", profile, "--rows", str(args.rows), "--ops", str(args.ops),
+             "--write-ratio", str(args.write_ratio)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out.splitlines()[-1]))
+    print(f"{args.rows} rows, {args.ops} operations, {args.write_ratio:.0%} writes (one commit each)")
+    print_table(results, ["profile", "ops_per_sec", "p50_ms", "p99_ms", "read_p99_ms", "write_p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Compare allocations of the list-serialization paths.
+
+``dicts`` is the previous GET /todos path: rows fetched as ``sqlite3.Row``,
+copied to dicts, validated into ``TodoResponse`` models, dumped back to
+plain objects and JSON-encoded. ``sql-json`` is the current path: SQLite
+encodes each todo as JSON text and Python joins the strings into the array.
+
+Two measurements with tracemalloc, per page of ``--limit`` rows:
+
+* Objects allocated per row by each stage, with every intermediate kept
+  alive so none of them is freed before it is counted.
+* End to end through the ASGI app, the list cache disabled: peak traced
+  bytes per row and latency. The previous path is mounted on a
+  benchmark-only route with the old endpoint's signature.
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 100000] [--limit 1000] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+from common import load_backend, percentiles, print_table, seed, temp_db_path
+
+IGNORE_TRACEMALLOC = tracemalloc.Filter(False, tracemalloc.__file__)
+
+
+def allocated_blocks(fn, *args):
+    """Run ``fn(*args)``; return its result and the memory blocks it left allocated."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces([IGNORE_TRACEMALLOC])
+    result = fn(*args)
+    after = tracemalloc.take_snapshot().filter_traces([IGNORE_TRACEMALLOC])
+    tracemalloc.stop()
+    return result, sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+
+def stage_allocations(conn, limit):
+    import repository
+    from models import TodoResponse
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(list[TodoResponse])
+    query = f"SELECT {repository.TODO_COLUMNS} FROM todos ORDER BY id LIMIT ?"
+    stages = [
+        ("dicts", "fetch sqlite3.Row", lambda _: conn.execute(query, (limit,)).fetchall()),
+        ("dicts", "dict per row", lambda rows: [dict(row) for row in rows]),
+        ("dicts", "validate TodoResponse", adapter.validate_python),
+        ("dicts", "dump to plain objects", lambda models: adapter.dump_python(models, mode="json")),
+        ("dicts", "json.dumps + encode",
+         lambda plain: json.dumps(plain, ensure_ascii=False, separators=(",", ":")).encode()),
+        ("sql-json", "SQLite JSON + join",
+         lambda _: repository.query_todos_json(conn, None, limit, None, None, "asc")),
+    ]
+    results = []
+    value = None
+    totals = {}
+    for path, stage, fn in stages:
+        value, blocks = allocated_blocks(fn, value if path == "dicts" else None)
+        totals[path] = totals.get(path, 0) + blocks
+        results.append({"path": path, "stage": stage, "blocks_per_row": round(blocks / limit, 2)})
+    for path, blocks in totals.items():
+        results.append({"path": path, "stage": "TOTAL", "blocks_per_row": round(blocks / limit, 2)})
+    return results
+
+
+async def endpoint_allocations(main_module, limit, requests_count):
+    import httpx
+    import repository
+    from fastapi import Query
+    from models import TodoResponse
+
+    app = main_module.app
+
+    @app.get("/bench/todos-dicts", response_model=list[TodoResponse])
+    async def todos_as_dicts(after_id: int | None = None, limit: int = Query(100, ge=1, le=1000)):
+        todos, _ = await main_module.db_read(repository.query_todos, after_id, limit, None, None, "asc")
+        return todos
+
+    main_module.list_cache.maxsize = 0
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with main_module.lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path, url in (("dicts", "/bench/todos-dicts"), ("sql-json", "/todos")):
+                samples, peaks = [], []
+                for i in range(requests_count):
+                    params = {"after_id": i * 7, "limit": limit}
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    res = await client.get(url, params=params)
+                    samples.append(time.perf_counter() - start)
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+                    assert res.status_code == 200 and len(res.json()) == limit
+                summary = percentiles(samples)
+                results.append({
+                    "path": path,
+                    "peak_bytes_per_row": round(sorted(peaks)[len(peaks) // 2] / limit),
+                    "p50_ms": summary["p50_ms"],
+                    "p99_ms": summary["p99_ms"],
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=1000, help="rows per page")
+    parser.add_argument("--requests", type=int, default=200, help="requests per path (end to end)")
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    main_module = load_backend(db_path)
+    seed(db_path, args.rows)
+    from database import get_read_connection
+
+    conn = get_read_connection()
+    print(f"Objects allocated per row, page of {args.limit} rows")
+    print_table(stage_allocations(conn, args.limit), ["path", "stage", "blocks_per_row"])
+    conn.close()
+
+    print(f"\nEnd to end, {args.requests} requests per path, list cache disabled")
+    results = asyncio.run(endpoint_allocations(main_module, args.limit, args.requests))
+    print_table(results, ["path", "peak_bytes_per_row", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
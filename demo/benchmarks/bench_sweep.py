@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Show that the idle-timer sweep costs follow running timers, not todos.
+
+For each ``--sizes`` row count, in a fresh subprocess, seeds the table with
+``--running`` idle timers spread evenly through it and times
+``maintenance.stop_idle_timers``:
+
+* an idle sweep, when no timer is past the limit (the usual case);
+* the sweep that stops all of them, in batches of ``IDLE_TIMER_BATCH``.
+
+The scheduled sweep is disabled (TODO_IDLE_TIMER_LIMIT=0); the benchmark
+sets the limit itself and calls the sweep directly.
+
+Usage:
+    python benchmarks/bench_sweep.py [--sizes 100000,1000000] [--running 1000]
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+from common import load_backend, print_table, seed, temp_db_path
+
+
+async def measure(args):
+    db_path = temp_db_path()
+    main_module = load_backend(db_path)
+    # seed() starts its timers in 2023, long past any limit
+    seed(db_path, args.rows, running_every=args.rows // args.running)
+    import maintenance
+
+    results = []
+    async with main_module.lifespan(main_module.app):
+        for name, limit in (("idle sweep", 10**10), ("stop all", 3600)):
+            maintenance.IDLE_TIMER_LIMIT = limit
+            samples = []
+            for _ in range(args.repeat if name == "idle sweep" else 1):
+                start = time.perf_counter()
+                stopped = await maintenance.stop_idle_timers()
+                samples.append(time.perf_counter() - start)
+            results.append({
+                "rows": args.rows,
+                "sweep": name,
+                "stopped": stopped,
+                "ms": round(min(samples) * 1000, 3),
+            })
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100000,1000000", help="comma-separated row counts")
+    parser.add_argument("--running", type=int, default=1000, help="idle timers in the table")
+    parser.add_argument("--repeat", type=int, default=20, help="idle sweeps timed (best is reported)")
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rows:
+        asyncio.run(measure(args))
+        return
+
+    results = []
+    for rows in args.sizes.split(","):
+        out = subprocess.run(
+            [sys.executable, __file__, "--rows", rows, "--running", str(args.running), "--repeat", str(args.repeat)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.extend(json.loads(out.splitlines()[-1]))
+    print(f"{args.running} idle timers per table")
+    print_table(results, ["rows", "sweep", "stopped", "ms"])
+
+
+if __name__ == "__main__":
+    main()
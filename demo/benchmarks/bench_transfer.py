@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Measure bulk import and export throughput and memory.
+
+For each ``--sizes`` row count and each format (NDJSON, CSV), in a fresh
+subprocess with the app driven in-process:
+
+* import: ``POST /todos/import`` of a generated upload, sent in 64 KiB
+  chunks, into an empty database.
+* export: ``GET /todos/export`` of the imported table, body discarded as
+  it arrives.
+
+Reports rows/sec and the peak memory traced by tracemalloc during each
+request; the peak should stay flat as the row count grows. Rates include
+the tracing overhead, so compare them with each other, not with other
+benchmarks.
+
+Usage:
+    python benchmarks/bench_transfer.py [--sizes 100000,1000000]
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from common import load_backend, print_table, stream_get, temp_db_path
+
+UPLOAD_CHUNK = 64 * 1024
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def upload(rows, fmt):
+    """Yield an upload of ``rows`` todos in ``UPLOAD_CHUNK``-sized pieces."""
+    if fmt == "csv":
+        yield b"title,completed\n"
+        line = lambda i: f'"Imported, todo {i}",{"true" if i % 3 == 0 else "false"}\n'
+    else:
+        line = lambda i: json.dumps({"title": f"Imported todo {i}", "completed": i % 3 == 0}) + "\n"
+    buffer = []
+    size = 0
+    for i in range(rows):
+        buffer.append(line(i))
+        size += len(buffer[-1])
+        if size >= UPLOAD_CHUNK:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+async def measure(args):
+    main_module = load_backend(temp_db_path())
+    import httpx
+
+    media_type = FORMATS[args.format]
+    results = []
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with main_module.lifespan(main_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            tracemalloc.start()
+            started = time.perf_counter()
+            res = await client.post(
+                "/todos/import", content=upload(args.rows, args.format), headers={"Content-Type": media_type}
+            )
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert res.status_code == 200 and res.json()["imported"] == args.rows, res.text
+            results.append({"rows": args.rows, "format": args.format, "operation": "import",
+                            "rows_per_sec": round(args.rows / elapsed), "peak_kib": round(peak / 1024)})
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = await stream_get(main_module.app, "/todos/export", [("Accept", media_type)])
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results.append({"rows": args.rows, "format": args.format, "operation": "export",
+                         "rows_per_sec": round(args.rows / elapsed), "peak_kib": round(peak / 1024),
+                         "mib": round(size / 2**20, 1)})
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100000,1000000", help="comma-separated row counts")
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--format", choices=FORMATS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rows:
+        asyncio.run(measure(args))
+        return
+
+    results = []
+    for rows in args.sizes.split(","):
+        for fmt in FORMATS:
+            out = subprocess.run(
+                [sys.executable, __file__, "--rows", rows, "--format", fmt],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results.extend(json.loads(out.splitlines()[-1]))
+    print_table(results, ["rows", "format", "operation", "rows_per_sec", "peak_kib", "mib"])
+
+
+if __name__ == "__main__":
+    main()
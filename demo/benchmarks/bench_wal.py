@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Measure list-query latency for readers while a writer is busy.
+
+For each journal mode the benchmark runs reader threads against the
+read-only pool, first alone and then alongside a writer process that keeps
+committing large batches (a separate process, like a second uvicorn
+worker, so it does not compete for the readers' GIL). It reports reader
+p50/p99 for both phases. Each mode runs in a fresh subprocess because the
+backend reads its configuration at import time.
+
+Usage:
+    python benchmarks/bench_wal.py [--rows 100000] [--seconds 3] [--readers 2]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+
+WRITER_SCRIPT = """
+import sqlite3, sys
+conn = sqlite3.connect(sys.argv[1], timeout=30)
+batch = int(sys.argv[2])
+commits = 0
+print("ready", flush=True)
+while True:
+    conn.executemany("INSERT INTO todos (title) VALUES (?)", ((f"Bulk {i}",) for i in range(batch)))
+    conn.commit()
+    commits += 1
+    print(commits, flush=True)
+"""
+
+from common import load_backend, percentiles, print_table, seed, temp_db_path
+
+MODES = ["DELETE", "WAL"]
+
+
+def measure(args):
+    db_path = temp_db_path()
+    load_backend(db_path, TODO_DB_JOURNAL_MODE=args.mode)
+    seed(db_path, args.rows)
+    import repository
+    from database import read_pool
+
+    def readers(seconds):
+        samples = []
+        stop = time.monotonic() + seconds
+
+        def loop():
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                with read_pool.connection() as conn:
+                    repository.query_todos(conn, None, 100, None, None, "desc")
+                samples.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=loop) for _ in range(args.readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return samples
+
+    results = [{"mode": args.mode, "phase": "readers only", **percentiles(readers(args.seconds))}]
+
+    writer = subprocess.Popen(
+        [sys.executable, "-c", WRITER_SCRIPT, db_path, str(args.batch)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    writer.stdout.readline()
+    samples = readers(args.seconds)
+    writer.kill()
+    commits = writer.communicate()[0].split()
+    results.append({"mode": args.mode, "phase": f"with writer ({commits[-1] if commits else 0} commits)", **percentiles(samples)})
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=5000, help="rows per write transaction")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args)
+        return
+
+    results = []
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--rows", str(args.rows), "--seconds", str(args.seconds),
+             "--readers", str(args.readers), "--batch", str(args.batch)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.extend(json.loads(out.splitlines()[-1]))
+    print(f"{args.rows} rows, {args.readers} readers, writer commits {args.batch} rows per transaction")
+    print_table(results, ["mode", "phase", "count", "p50_ms", "p99_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    main()
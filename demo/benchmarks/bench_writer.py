@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compare write throughput with per-request commits and with group commit.
+
+Many threads create todos through ``run_write``, the same path the HTTP
+endpoints use, first committing one operation at a time and then through
+the group-commit writer.
+
+Usage:
+    python benchmarks/bench_writer.py [--threads 40] [--ops 200]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import load_backend, percentiles, print_table, temp_db_path
+
+
+def run(threads, ops_per_thread):
+    import repository
+    from writer import run_write
+
+    def worker(n):
+        samples = []
+        for i in range(ops_per_thread):
+            start = time.perf_counter()
+            run_write(repository.create_todo, f"Write {n}-{i}", False)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        samples = [s for chunk in executor.map(worker, range(threads)) for s in chunk]
+    elapsed = time.perf_counter() - start
+    return {"ops_per_sec": round(len(samples) / elapsed), **percentiles(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--ops", type=int, default=200, help="operations per thread")
+    parser.add_argument("--synchronous", help="writer durability: FULL, NORMAL or OFF (default: profile)")
+    args = parser.parse_args()
+
+    load_backend(temp_db_path())
+    from database import write_pool
+    from writer import GroupCommitWriter
+    import writer as writer_module
+
+    results = [{"mode": "per-request commit", **run(args.threads, args.ops)}]
+
+    writer_module.writer = GroupCommitWriter(synchronous=args.synchronous)
+    writer_module.writer.start()
+    try:
+        results.append({"mode": "group commit", **run(args.threads, args.ops)})
+        stats = writer_module.writer.stats()
+    finally:
+        writer_module.writer.stop()
+        write_pool.close()
+
+    print(f"{args.threads} threads x {args.ops} creates")
+    print_table(results, ["mode", "ops_per_sec", "p50_ms", "p99_ms"])
+    print("writer:", stats)
+
+
+if __name__ == "__main__":
+    main()
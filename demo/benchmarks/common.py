@@ -0,0 +1,117 @@
+"""
+Shared helpers for the backend benchmarks.
+
+The backend reads its configuration (database path, pool size, ...) from the
+environment at import time, so benchmarks call ``load_backend`` before
+touching any backend module.
+"""
+
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def temp_db_path(name="bench.db"):
+    """Return a path for a throwaway database in a fresh temp directory."""
+    return str(Path(tempfile.mkdtemp(prefix="todo-bench-")) / name)
+
+
+def load_backend(db_path, **env):
+    """Point the backend at ``db_path`` and import it, returning ``main``.
+
+    The idle-timer sweep is off unless ``env`` sets TODO_IDLE_TIMER_LIMIT:
+    ``seed`` starts its timers in 2023, and the sweep would stop them all
+    when the lifespan starts.
+    """
+    os.environ["TODO_DB"] = db_path
+    env = {"TODO_IDLE_TIMER_LIMIT": 0, **env}
+    for key, value in env.items():
+        os.environ[key] = str(value)
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    import database
+    import main
+
+    database.init_db()
+    return main
+
+
+def seed(db_path, rows, running_every=50, batch=50_000):
+    """Insert ``rows`` todos; every ``running_every``-th one has a running timer."""
+    conn = sqlite3.connect(db_path)
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO todos (title, completed, time_spent, last_started_at) VALUES (?, ?, ?, ?)",
+            [
+                (f"Seeded todo {i}", i % 3 == 0, i % 600, 1_700_000_000.0 if i % running_every == 0 else None)
+                for i in range(start, min(start + batch, rows))
+            ],
+        )
+        conn.commit()
+    conn.close()
+
+
+async def stream_get(app, path, headers=()):
+    """GET ``path`` from an ASGI app, discarding the body; return its size in bytes.
+
+    ``httpx.ASGITransport`` collects the whole response before returning it,
+    which would hide whether a streaming endpoint runs in constant memory.
+    """
+    requested = False
+    done = asyncio.Event()
+    size = 0
+
+    async def receive():
+        # No request body; after it, the client stays connected until the
+        # response is complete
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    done.set()
+    return size
+
+
+def percentiles(samples):
+    """Summarize latency samples (seconds) as milliseconds."""
+    ordered = sorted(samples)
+    q = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(q[49] * 1000, 3),
+        "p95_ms": round(q[94] * 1000, 3),
+        "p99_ms": round(q[98] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as an aligned text table."""
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).ljust(widths[c]) for c in columns))
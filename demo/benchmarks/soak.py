@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Soak test a multi-worker uvicorn and watch for resource leaks.
+
+Starts ``uvicorn main:app --workers N`` on a seeded temporary database and
+drives it with a configurable mix of operations from ``--concurrency``
+clients. Every ``--interval`` seconds it samples, summed over the uvicorn
+processes, resident memory (VmRSS) and open file descriptors from /proc,
+plus request rate, errors and latency percentiles for the interval.
+
+After a warm-up (the first quarter of the run) the samples are split into
+four windows. The run fails if RSS or the FD count rises from each window to
+the next by more than the allowed slack (steady growth, i.e. a leak), or if
+the error rate exceeds ``--max-error-rate``. The time series and verdict are
+written to ``--report`` as JSON. Linux only (reads /proc).
+
+Operations: ``list`` (GET /todos at a random cursor), ``create``, ``update``,
+``toggle`` and ``missing`` (PUT on an id that does not exist, exercising the
+404 path that used to leak connections).
+
+Usage:
+    python benchmarks/soak.py [--duration 300] [--workers 2] [--mix list=60,create=10,update=15,toggle=10,missing=5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from common import BACKEND_DIR, load_backend, percentiles, seed, temp_db_path
+
+DEFAULT_MIX = "list=60,create=10,update=15,toggle=10,missing=5"
+MISSING_ID = 2**62
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("list", "create", "update", "toggle", "missing"):
+            raise SystemExit(f"Unknown operation in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_tree(root):
+    """Return ``root`` and its descendant pids."""
+    children = {}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            ppid = int((entry / "stat").read_text().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry.name))
+    pids, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def resource_usage(root):
+    """Return ``(rss_bytes, open_fds)`` summed over the process tree."""
+    rss = fds = 0
+    for pid in process_tree(root):
+        try:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    rss += int(line.split()[1]) * 1024
+            fds += len(os.listdir(f"/proc/{pid}/fd"))
+        except OSError:
+            continue
+    return rss, fds
+
+
+def steady_growth(values, slack):
+    """True if the medians of four windows rise each time by more than ``slack``."""
+    if len(values) < 8:
+        return False
+    size = len(values) // 4
+    medians = [statistics.median(values[i * size:(i + 1) * size]) for i in range(4)]
+    return all(later - earlier > slack for earlier, later in zip(medians, medians[1:]))
+
+
+async def client(http, rows, mix, rng, stop, stats):
+    names, weights = list(mix), list(mix.values())
+    while time.monotonic() < stop:
+        op = rng.choices(names, weights)[0]
+        if op == "list":
+            request = ("GET", "/todos", {"params": {"after_id": rng.randint(0, rows)}})
+        elif op == "create":
+            request = ("POST", "/todos", {"json": {"title": "Soak todo"}})
+        elif op == "update":
+            request = ("PUT", f"/todos/{rng.randint(1, rows)}", {"json": {"completed": rng.random() < 0.5}})
+        elif op == "toggle":
+            request = ("POST", f"/todos/{rng.randint(1, rows)}/toggle-timer", {})
+        else:
+            request = ("PUT", f"/todos/{MISSING_ID}", {"json": {"completed": True}})
+        method, url, kwargs = request
+        start = time.perf_counter()
+        try:
+            res = await http.request(method, url, **kwargs)
+            failed = res.status_code >= 500 or (res.status_code >= 400 and op != "missing")
+        except Exception:
+            failed = True
+        stats["latencies"].append(time.perf_counter() - start)
+        stats["requests"] += 1
+        stats["errors"] += failed
+
+
+async def run_load(args, base_url, server_pid):
+    import httpx
+
+    mix = parse_mix(args.mix)
+    stats = {"latencies": [], "requests": 0, "errors": 0}
+    samples = []
+    started = time.monotonic()
+    stop = started + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as http:
+        clients = [
+            asyncio.create_task(client(http, args.rows, mix, random.Random(i), stop, stats))
+            for i in range(args.concurrency)
+        ]
+        while time.monotonic() < stop:
+            await asyncio.sleep(args.interval)
+            latencies = stats["latencies"]
+            requests, errors = stats["requests"], stats["errors"]
+            stats.update(latencies=[], requests=0, errors=0)
+            rss, fds = resource_usage(server_pid)
+            sample = {
+                "t": round(time.monotonic() - started, 1),
+                "rss_mb": round(rss / 2**20, 1),
+                "fds": fds,
+                "rps": round(requests / args.interval),
+                "errors": errors,
+            }
+            if latencies:
+                summary = percentiles(latencies)
+                sample.update(p50_ms=summary["p50_ms"], p99_ms=summary["p99_ms"])
+            samples.append(sample)
+            if len(samples) == 1:
+                print("  ".join(sample))
+            print("  ".join(str(v) for v in sample.values()), flush=True)
+        await asyncio.gather(*clients)
+    return samples
+
+
+def verdict(samples, args):
+    measured = samples[len(samples) // 4:]
+    total = sum(s["rps"] * args.interval for s in samples)
+    errors = sum(s["errors"] for s in samples)
+    failures = []
+    rss = [s["rss_mb"] for s in measured]
+    if steady_growth(rss, args.rss_slack_mb):
+        failures.append(f"RSS grew steadily: {rss[0]} MB -> {rss[-1]} MB")
+    fds = [s["fds"] for s in measured]
+    if steady_growth(fds, 0):
+        failures.append(f"open FDs grew steadily: {fds[0]} -> {fds[-1]}")
+    if total and errors / total > args.max_error_rate:
+        failures.append(f"error rate {errors / total:.2%} exceeds {args.max_error_rate:.2%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=300, help="seconds of load")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between samples")
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--rows", type=int, default=10_000, help="seeded todos")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. list=80,toggle=20")
+    parser.add_argument("--rss-slack-mb", type=float, default=2.0, help="RSS rise per window tolerated as noise")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--report", default="soak-report.json", help="where to write the JSON time series")
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    db_path = temp_db_path()
+    load_backend(db_path)
+    seed(db_path, args.rows)
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(args.workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, "TODO_DB": db_path},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        import httpx
+
+        for _ in range(100):
+            try:
+                if httpx.get(f"{base_url}/").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+        else:
+            raise SystemExit("uvicorn did not start")
+
+        print(f"Soaking {base_url}: {args.workers} workers, {args.concurrency} clients, "
+              f"{args.duration:.0f}s, mix {args.mix}")
+        samples = asyncio.run(run_load(args, base_url, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+    failures = verdict(samples, args)
+    with open(args.report, "w") as f:
+        json.dump({"config": vars(args), "samples": samples, "failures": failures}, f, indent=2)
+        f.write("\n")
+    print(f"Report written to {args.report}")
+    for failure in failures:
+        print("FAIL:", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
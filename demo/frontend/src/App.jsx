@@ -13,12 +13,58 @@ function App() {
     fetchTodos();
   }, []);
 
+  // Record when each todo arrived: a running timer counts up from the
+  // server's effective_time_spent on the browser's own clock
+  const received = (list) => {
+    const receivedAt = Date.now();
+    return list.map(t => ({ ...t, receivedAt }));
+  };
+
+  // Merge changed todos into the list, appending ones we have not seen yet
+  const upsertTodos = (todos) => {
+    const changed = received(todos);
+    setTodos(currentTodos => {
+      const byId = new Map(changed.map(t => [t.id, t]));
+      const merged = currentTodos.map(t => byId.has(t.id) ? { ...t, ...byId.get(t.id) } : t);
+      const known = new Set(currentTodos.map(t => t.id));
+      return [...merged, ...changed.filter(t => !known.has(t.id))];
+    });
+  };
+
+  // Live updates pushed by the backend instead of polling
+  useEffect(() => {
+    const source = new EventSource(`${API_URL}/events`);
+    const onUpsert = (e) => upsertTodos(JSON.parse(e.data).todos);
+    source.addEventListener('created', onUpsert);
+    source.addEventListener('updated', onUpsert);
+    source.addEventListener('timer', onUpsert);
+    source.addEventListener('deleted', (e) => {
+      const gone = new Set(JSON.parse(e.data).ids);
+      setTodos(currentTodos => currentTodos.filter(t => !gone.has(t.id)));
+    });
+    // The server dropped us as a slow consumer; start again from a full fetch
+    source.addEventListener('resync', () => fetchTodos());
+    // Bulk imports only report progress; load the result once they finish
+    source.addEventListener('imported', (e) => {
+      if (JSON.parse(e.data).done) fetchTodos();
+    });
+    return () => source.close();
+  }, []);
+
+  // GET /todos is paged; follow X-Next-Cursor until the last page
   const fetchTodos = async () => {
     try {
-      const res = await fetch(API_URL);
-      if (!res.ok) throw new Error('Failed to fetch');
-      const data = await res.json();
-      setTodos(data);
+      const all = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ limit: '1000' });
+        if (cursor !== null) params.set('after_id', cursor);
+        const res = await fetch(`${API_URL}?${params}`);
+        if (!res.ok) throw new Error('Failed to fetch');
+        all.push(...received(await res.json()));
+        cursor = res.headers.get('X-Next-Cursor');
+      } while (cursor !== null);
+      setTodos(all);
     } catch (err) {
       setError(err.message);
     } finally {
@@ -37,7 +83,7 @@ function App() {
         body: JSON.stringify({ title: inputValue })
       });
       const newTodo = await res.json();
-      setTodos([...todos, newTodo]);
+      upsertTodos([newTodo]);
       setInputValue('');
     } catch (err) {
       console.error('Error adding todo:', err);
@@ -52,7 +98,7 @@ function App() {
         body: JSON.stringify({ completed: !currentStatus })
       });
       const updated = await res.json();
-      setTodos(todos.map(t => t.id === id ? updated : t));
+      upsertTodos([updated]);
     } catch (err) {
       console.error('Error updating todo:', err);
     }
@@ -64,28 +110,26 @@ function App() {
         method: 'POST'
       });
       const updated = await res.json();
-      setTodos(todos.map(t => t.id === id ? updated : t));
+      upsertTodos([updated]);
     } catch (err) {
       console.error('Error toggling timer:', err);
     }
   };
 
-  // Local ticker for running timers
+  // Re-render running timers every second. Elapsed time is derived from
+  // the wall clock, so it stays right after the tab sleeps or skips ticks.
+  const [now, setNow] = useState(() => Date.now());
   useEffect(() => {
-    const interval = setInterval(() => {
-      setTodos(currentTodos =>
-        currentTodos.map(t => {
-          if (t.is_running) {
-            // Optimistic update for display only
-            return { ...t, time_spent: t.time_spent + 1 };
-          }
-          return t;
-        })
-      );
-    }, 1000);
+    const interval = setInterval(() => setNow(Date.now()), 1000);
     return () => clearInterval(interval);
   }, []);
 
+  // Only time measured by the browser is added to the server's value, so a
+  // browser clock set differently from the server's does not skew it
+  const elapsedTime = (todo) => todo.is_running
+    ? todo.effective_time_spent + Math.max(0, Math.floor((now - todo.receivedAt) / 1000))
+    : todo.time_spent;
+
   const formatTime = (seconds) => {
     const mins = Math.floor(seconds / 60);
     const secs = seconds % 60;
@@ -95,7 +139,7 @@ function App() {
   const deleteTodo = async (id) => {
     try {
       await fetch(`${API_URL}/${id}`, { method: 'DELETE' });
-      setTodos(todos.filter(t => t.id !== id));
+      setTodos(currentTodos => currentTodos.filter(t => t.id !== id));
     } catch (err) {
       console.error('Error deleting todo:', err);
     }
@@ -134,7 +178,7 @@ function App() {
             </span>
 
             <div className="timer-controls">
-              <span className="time-display">{formatTime(todo.time_spent)}</span>
+              <span className="time-display">{formatTime(elapsedTime(todo))}</span>
               <button
                 className={`timer-btn ${todo.is_running ? 'running' : ''}`}
                 onClick={() => toggleTimer(todo.id)}
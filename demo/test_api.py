@@ -1,13 +1,20 @@
 
+import csv
+import io
+import json
+import os
+import sqlite3
 import subprocess
 import time
 import requests
 import sys
 
-# Start server in background
+# Start server in background; step 13 back-dates a timer, so the idle-timer
+# sweep is off
 process = subprocess.Popen(
     ["uvicorn", "main:app", "--port", "8001"], 
     cwd="backend",
+    env={**os.environ, "TODO_IDLE_TIMER_LIMIT": "0"},
     stdout=subprocess.PIPE,
     stderr=subprocess.PIPE
 )
@@ -38,6 +45,28 @@ try:
     assert len(res.json()) >= 1
     print("✅ List Todos working")
 
+    # 3b. Test Pagination
+    requests.post(f"{base_url}/todos", json={"title": "Second Todo", "completed": True})
+    res = requests.get(f"{base_url}/todos", params={"limit": 1})
+    assert res.status_code == 200
+    assert len(res.json()) == 1
+    cursor = res.headers["X-Next-Cursor"]
+    res = requests.get(f"{base_url}/todos", params={"limit": 1, "after_id": cursor})
+    assert res.json()[0]["id"] > int(cursor)
+    res = requests.get(f"{base_url}/todos", params={"completed": "true", "order": "desc"})
+    assert all(t["completed"] for t in res.json())
+    print("✅ Paginated List working")
+
+    # 3c. Test ETag revalidation
+    res = requests.get(f"{base_url}/todos")
+    etag = res.headers["ETag"]
+    res = requests.get(f"{base_url}/todos", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    requests.post(f"{base_url}/todos", json={"title": "Changes ETag"})
+    res = requests.get(f"{base_url}/todos", headers={"If-None-Match": etag})
+    assert res.status_code == 200 and res.headers["ETag"] != etag
+    print("✅ ETag revalidation working")
+
     # 4. Test Update
     res = requests.put(f"{base_url}/todos/{todo_id}", json={"completed": True})
     assert res.status_code == 200
@@ -49,6 +78,131 @@ try:
     assert res.status_code == 200
     print("✅ Delete Todo working")
 
+    # 6. Test Batch Create / Update / Delete
+    res = requests.post(f"{base_url}/todos:batchCreate", json={"items": [{"title": f"Bulk {i}"} for i in range(3)]})
+    assert res.status_code == 200
+    ids = [t["id"] for t in res.json()]
+    assert len(set(ids)) == 3
+    res = requests.post(f"{base_url}/todos:batchUpdate", json={"items": [{"id": ids[0], "completed": True}, {"id": todo_id, "title": "Gone"}]})
+    assert [r["status"] for r in res.json()] == [200, 404]
+    assert res.json()[0]["todo"]["completed"] is True
+    res = requests.post(f"{base_url}/todos:batchDelete", json={"ids": ids})
+    assert all(r["status"] == 200 for r in res.json())
+    print("✅ Batch endpoints working")
+
+    # 7. Test Stats
+    res = requests.get(f"{base_url}/todos/stats")
+    assert res.status_code == 200
+    stats = res.json()
+    assert stats["total"] >= stats["completed"] >= 0
+    before = stats["total"]
+    requests.post(f"{base_url}/todos", json={"title": "Counted", "completed": True})
+    assert requests.get(f"{base_url}/todos/stats").json()["total"] == before + 1
+    print("✅ Stats working")
+
+    # 8. Test Search
+    requests.post(f"{base_url}/todos", json={"title": "Renew passport photos"})
+    res = requests.get(f"{base_url}/todos/search", params={"q": "passport pho"})
+    assert res.status_code == 200
+    assert [t["title"] for t in res.json()][:1] == ["Renew passport photos"]
+    assert requests.get(f"{base_url}/todos/search", params={"q": "?!"}).status_code == 422
+    print("✅ Search working")
+
+    # 9. Test Delta Sync
+    cursor = requests.get(f"{base_url}/todos/changes").json()["cursor"]
+    kept = requests.post(f"{base_url}/todos", json={"title": "Synced"}).json()["id"]
+    gone = requests.post(f"{base_url}/todos", json={"title": "Tombstoned"}).json()["id"]
+    requests.delete(f"{base_url}/todos/{gone}")
+    res = requests.get(f"{base_url}/todos/changes", params={"since": cursor})
+    assert res.status_code == 200
+    assert [t["id"] for t in res.json()["todos"]] == [kept]
+    assert res.json()["deleted"] == [gone]
+    assert requests.get(f"{base_url}/todos/changes", params={"since": res.json()["cursor"] + 1}).status_code == 410
+    print("✅ Delta sync working")
+
+    # 10. Test Metrics
+    res = requests.get(f"{base_url}/metrics")
+    assert res.status_code == 200
+    assert 'todo_http_requests_total{method="DELETE",route="/todos/{todo_id}",status="200"} 2' in res.text
+    assert "todo_db_commit_duration_seconds_count" in res.text
+    print("✅ Metrics working")
+
+    # 11. Test Content Negotiation
+    everything = requests.get(f"{base_url}/todos", params={"limit": 1000}).json()
+    res = requests.get(f"{base_url}/todos", headers={"Accept": "application/x-ndjson"})
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in res.text.splitlines()] == everything
+    res = requests.get(f"{base_url}/todos", params={"limit": 2, "order": "desc"}, headers={"Accept": "application/x-ndjson"})
+    assert [json.loads(line) for line in res.text.splitlines()] == everything[::-1][:2]
+    res = requests.get(f"{base_url}/todos", headers={"Accept": "application/msgpack"})
+    try:
+        import msgpack
+    except ImportError:
+        msgpack = None
+        assert res.status_code == 406
+    else:
+        assert msgpack.unpackb(res.content) == requests.get(f"{base_url}/todos").json()
+    timed = requests.post(f"{base_url}/todos/{everything[0]['id']}/toggle-timer").json()
+    res = requests.get(f"{base_url}/todos", headers={"If-None-Match": etag})
+    assert res.status_code == 200 and "ETag" not in res.headers
+    started = {timed["last_started_at"], res.json()[0]["last_started_at"]}
+    etag = requests.get(f"{base_url}/todos", params={"after_id": timed["id"]}).headers["ETag"]
+    assert requests.get(f"{base_url}/todos", params={"after_id": timed["id"]}, headers={"If-None-Match": etag}).status_code == 304
+    started.update(t["last_started_at"] for t in requests.get(f"{base_url}/todos/running").json())
+    if msgpack is not None:
+        started.add(msgpack.unpackb(requests.get(f"{base_url}/todos", headers={"Accept": "application/msgpack"}).content)[0]["last_started_at"])
+    requests.post(f"{base_url}/todos/{timed['id']}/toggle-timer")
+    assert started == {timed["last_started_at"]}
+    assert requests.get(f"{base_url}/todos", headers={"Accept": "text/csv"}).status_code == 406
+    print("✅ Content negotiation working")
+
+    # 12. Test Bulk Export and Import
+    everything = requests.get(f"{base_url}/todos", params={"limit": 1000}).json()
+    res = requests.get(f"{base_url}/todos/export")
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in res.text.splitlines()] == everything
+    res = requests.get(f"{base_url}/todos/export", headers={"Accept": "text/csv"})
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [(int(r["id"]), r["title"]) for r in rows] == [(t["id"], t["title"]) for t in everything]
+    upload = '{"title": "Imported 1"}\n{"completed": true}\n\n{"title": "Imported 2", "completed": true}\n'
+    res = requests.post(f"{base_url}/todos/import", data=upload, headers={"Content-Type": "application/x-ndjson"})
+    assert res.status_code == 200
+    assert res.json()["imported"] == 2 and [e["line"] for e in res.json()["errors"]] == [2]
+    upload = 'title,completed\n"Quoted, with\nline break",true\nPlain,\n'
+    res = requests.post(f"{base_url}/todos/import", data=upload, headers={"Content-Type": "text/csv"})
+    assert res.json() == {"imported": 2, "failed": 0, "errors": []}
+    titles = [t["title"] for t in requests.get(f"{base_url}/todos", params={"order": "desc", "limit": 2}).json()]
+    assert titles == ["Plain", "Quoted, with\nline break"]
+    upload = 'title,completed\nBuy 5" nails,false\nSecond,true\n'
+    res = requests.post(f"{base_url}/todos/import", data=upload, headers={"Content-Type": "text/csv"})
+    assert res.json() == {"imported": 2, "failed": 0, "errors": []}
+    titles = [t["title"] for t in requests.get(f"{base_url}/todos", params={"order": "desc", "limit": 2}).json()]
+    assert titles == ["Second", 'Buy 5" nails']
+    res = requests.post(f"{base_url}/todos/import", data="id,done\n1,true\n", headers={"Content-Type": "text/csv"})
+    assert res.status_code == 422
+    assert requests.post(f"{base_url}/todos/import", data="{}", headers={"Content-Type": "application/json"}).status_code == 415
+    print("✅ Bulk export and import working")
+
+    # 13. Test a timer session spanning several UTC midnights
+    todo_id = requests.post(f"{base_url}/todos", json={"title": "Three days"}).json()["id"]
+    requests.post(f"{base_url}/todos/{todo_id}/toggle-timer")
+    started = time.time() - 72 * 3600
+    with sqlite3.connect("backend/todo.db") as conn:
+        conn.execute("UPDATE todos SET last_started_at = ? WHERE id = ?", (started, todo_id))
+    conn.close()
+    first_day = time.strftime("%Y-%m-%d", time.gmtime(started))
+    last_day = time.strftime("%Y-%m-%d", time.gmtime())
+    report = lambda: requests.get(f"{base_url}/reports/daily", params={"start": first_day, "end": last_day}).json()["days"]
+    before = report()
+    duration = requests.post(f"{base_url}/todos/{todo_id}/toggle-timer").json()["time_spent"]
+    after = report()
+    seconds = [a["seconds"] - b["seconds"] for a, b in zip(after, before)]
+    sessions = [a["sessions"] - b["sessions"] for a, b in zip(after, before)]
+    head = 86400 - int(started) % 86400
+    assert seconds == [head, 86400, 86400, duration - head - 2 * 86400]
+    assert sessions == [1, 0, 0, 0]
+    print("✅ Multi-day timer session split by day")
+
 except Exception as e:
     print(f"❌ Tests failed: {e}")
     sys.exit(1)
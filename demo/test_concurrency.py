@@ -0,0 +1,62 @@
+import subprocess
+import time
+import requests
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Start server in background
+process = subprocess.Popen(
+    ["uvicorn", "main:app", "--port", "8003"],
+    cwd="backend",
+    stdout=subprocess.PIPE,
+    stderr=subprocess.PIPE
+)
+
+print("Starting backend for concurrency test...")
+time.sleep(3)
+
+THREADS = 16
+TOGGLES = 400
+
+try:
+    base_url = "http://localhost:8003"
+    session = requests.Session()
+
+    def toggle(todo_id):
+        res = session.post(f"{base_url}/todos/{todo_id}/toggle-timer")
+        assert res.status_code == 200
+        return res.json()
+
+    # 1. Hammer one todo with concurrent toggles
+    todo_id = requests.post(f"{base_url}/todos", json={"title": "Concurrency Test"}).json()["id"]
+    started = time.time()
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(toggle, [todo_id] * TOGGLES))
+    elapsed = time.time() - started
+
+    # Every toggle must observe the state left by the previous one, so starts
+    # and stops are exactly balanced and the timer ends stopped.
+    starts = sum(1 for r in results if r["is_running"])
+    assert starts == TOGGLES // 2, f"{starts} starts for {TOGGLES} toggles"
+    final = requests.get(f"{base_url}/todos", params={"running": "false", "after_id": todo_id - 1, "limit": 1}).json()[0]
+    assert final["id"] == todo_id and final["is_running"] is False
+    assert final["time_spent"] <= elapsed + 1
+    print(f"✅ {TOGGLES} concurrent toggles balanced ({starts} starts)")
+
+    # 2. Concurrent stops of a long-running timer must not double-count
+    todo_id = requests.post(f"{base_url}/todos", json={"title": "Double Count Test"}).json()["id"]
+    toggle(todo_id)
+    print("⏳ Waiting 2 seconds...")
+    time.sleep(2)
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(toggle, [todo_id] * (THREADS + 1)))
+    final = max(r["time_spent"] for r in results)
+    assert 2 <= final <= 3, f"time_spent {final}s after a 2s run"
+    print(f"✅ No double counting. Time Spent: {final}s")
+
+except Exception as e:
+    print(f"❌ Tests failed: {e}")
+    sys.exit(1)
+finally:
+    process.terminate()
+    print("Backend stopped.")
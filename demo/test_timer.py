@@ -1,13 +1,15 @@
 
+import os
 import subprocess
 import time
 import requests
 import sys
 
-# Start server in background
+# Start server in background, with a short idle-timer limit for step 5
 process = subprocess.Popen(
     ["uvicorn", "main:app", "--port", "8002"], 
     cwd="backend",
+    env={**os.environ, "TODO_IDLE_TIMER_LIMIT": "4", "TODO_IDLE_TIMER_SWEEP_INTERVAL": "0.5"},
     stdout=subprocess.PIPE,
     stderr=subprocess.PIPE
 )
@@ -32,16 +34,47 @@ try:
     print("✅ Started Timer")
     
     print("⏳ Waiting 2 seconds...")
+    requests.get(f"{base_url}/todos")  # may be cached while the timer runs
     time.sleep(2)
-    
+
+    # Running timers report their live total, also from a repeated list read
+    running = requests.get(f"{base_url}/todos/running").json()
+    assert [t["id"] for t in running] == [todo_id]
+    assert running[0]["last_started_at"] == data["last_started_at"]
+    assert running[0]["effective_time_spent"] >= 2
+    listed = {t["id"]: t for t in requests.get(f"{base_url}/todos").json()}
+    assert listed[todo_id]["effective_time_spent"] >= 2
+    print(f"✅ Running timers: {running[0]['effective_time_spent']}s so far")
+
     # 3. Stop Timer
     res = requests.post(f"{base_url}/todos/{todo_id}/toggle-timer")
     assert res.status_code == 200
     data = res.json()
     assert data["is_running"] is False
     assert data["time_spent"] >= 2
+    assert data["effective_time_spent"] == data["time_spent"] and data["last_started_at"] is None
     print(f"✅ Stopped Timer. Time Sptent: {data['time_spent']}s")
 
+    # 4. Daily report includes the stopped session
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    res = requests.get(f"{base_url}/reports/daily", params={"start": today, "end": today})
+    assert res.status_code == 200
+    report = res.json()
+    assert report["days"][0]["sessions"] >= 1
+    assert report["total_seconds"] >= data["time_spent"]
+    print(f"✅ Daily report: {report['total_seconds']}s today")
+
+    # 5. A forgotten timer is stopped by the sweep and credited the limit
+    before = data["time_spent"]
+    requests.post(f"{base_url}/todos/{todo_id}/toggle-timer")
+    print("⏳ Waiting 6 seconds for the idle-timer sweep...")
+    time.sleep(6)
+    assert requests.get(f"{base_url}/todos/running").json() == []
+    todo = next(t for t in requests.get(f"{base_url}/todos").json() if t["id"] == todo_id)
+    assert todo["is_running"] is False and todo["time_spent"] == before + 4
+    assert "todo_idle_timers_stopped_total 1" in requests.get(f"{base_url}/metrics").text
+    print(f"✅ Idle timer stopped. Time Spent: {todo['time_spent']}s")
+
 except Exception as e:
     print(f"❌ Tests failed: {e}")
     sys.exit(1)